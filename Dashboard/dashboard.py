@@ -10,7 +10,11 @@ import pandas as pd
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from Schema.Data import Doctors, APPOINTMENTS, CLIENTS, Doctors_TIMESLOTS, MEDICAL_RECORDS
-from RAG.RAG_steps.vector_db import get_db_collection
+from RAG.RAG_steps.vector_db import get_vector_store
+from RAG.RAG_steps.embeddings import get_embedding_cache
+from RAG.RAG_steps.query_batcher import get_query_batcher
+from RAG.RAG_steps.retrieval_cache import get_retrieval_cache
+from RAG.RAG_steps.answer_cache import get_answer_cache
 
 st.set_page_config(page_title="Dashboard", page_icon="📊", layout="wide")
 
@@ -181,7 +185,7 @@ st.subheader("📚 RAG Document System")
 col1, col2, col3 = st.columns(3)
 
 try:
-    collection = get_db_collection()
+    collection = get_vector_store()
     doc_count = collection.count()
     
     with col1:
@@ -191,10 +195,62 @@ try:
         st.metric("🗄️ Collection", "Active")
     
     with col3:
-        st.metric("💾 Database", "ChromaDB")
+        st.metric("💾 Database", collection.name)
 except:
     st.warning("⚠️ RAG system not initialized. Upload documents in the Load page.")
 
+try:
+    cache_stats = get_embedding_cache().stats()
+    batch_stats = get_query_batcher().stats()
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        st.metric("🧠 Cached Embeddings", cache_stats['entries'])
+
+    with col2:
+        st.metric(
+            "🎯 Cache Hit Rate",
+            f"{cache_stats['hit_rate']:.0%}",
+            help=f"{cache_stats['hits']} hits / {cache_stats['misses']} misses since startup"
+        )
+
+    with col3:
+        st.metric("💽 Cache Size", f"{cache_stats['bytes'] / (1024 * 1024):.1f} MB")
+
+    with col4:
+        st.metric(
+            "📦 Query Batch Fill",
+            f"{batch_stats['fill_rate']:.0%}",
+            help=f"{batch_stats['requests']} questions in {batch_stats['batches']} batches "
+                 f"(avg {batch_stats['avg_batch_size']:.1f} per batch)"
+        )
+
+    retrieval_stats = get_retrieval_cache().stats()
+    answer_stats = get_answer_cache().stats()
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        st.metric("🔁 Cached Retrievals", retrieval_stats['entries'])
+
+    with col2:
+        st.metric(
+            "🎯 Retrieval Hit Rate",
+            f"{retrieval_stats['hit_rate']:.0%}",
+            help=f"{retrieval_stats['hits']} hits / {retrieval_stats['misses']} misses since startup"
+        )
+
+    with col3:
+        st.metric("💬 Cached Answers", answer_stats['entries'])
+
+    with col4:
+        st.metric(
+            "💸 LLM Calls Saved",
+            answer_stats['hits'],
+            help=f"{answer_stats['hit_rate']:.0%} of questions answered from the semantic answer cache"
+        )
+except:
+    pass
+
 st.divider()
 
 # ============================================================
@@ -0,0 +1,85 @@
+"""
+Parity and speed of the embedding backends (torch fp32, ONNX, ONNX int8).
+
+Parity: cosine similarity of every vector with the torch reference, and
+how often the top-3 retrieved chunks for the sample questions are the same.
+Speed: single-query latency (p50 / p95) as in the chatbot, and bulk
+throughput as in ingestion.
+
+Run from the project root:
+    python -m RAG.Benchmarks.bench_backends --backends torch onnx onnx-int8
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import numpy as np
+from RAG.RAG_steps.loading import load_documents_from_folder
+from RAG.RAG_steps.chunking import chunk_documents
+from RAG.RAG_steps.embeddings import load_embedder, MODEL_NAME
+
+QUESTIONS = [
+    "What is Sara's diagnosis?",
+    "Which medication was Ali prescribed?",
+    "What was Fatima's last blood pressure reading?",
+    "Does Malik have any allergies?",
+    "Which tests came back outside the normal range?",
+]
+
+
+def normalize(vectors):
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--folder", default="Medical_reports")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"])
+    parser.add_argument("--queries", type=int, default=200, help="single-query latency samples")
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        texts = [chunk['text'] for chunk in chunk_documents(load_documents_from_folder(args.folder))]
+
+    reference = None
+    print("=" * 60)
+    print(f"{MODEL_NAME}: {len(texts)} chunks, {len(QUESTIONS)} questions")
+    print("=" * 60)
+
+    for backend in ["torch"] + [b for b in args.backends if b != "torch"]:
+        model = load_embedder(MODEL_NAME, backend)
+        model.encode(texts[:8])  # warm up
+
+        start = time.perf_counter()
+        chunk_vectors = normalize(model.encode(texts, batch_size=32))
+        bulk_seconds = time.perf_counter() - start
+
+        latencies = []
+        for i in range(args.queries):
+            start = time.perf_counter()
+            model.encode([QUESTIONS[i % len(QUESTIONS)]])
+            latencies.append((time.perf_counter() - start) * 1000)
+        question_vectors = normalize(model.encode(QUESTIONS))
+        top_k = np.argsort(-question_vectors @ chunk_vectors.T, axis=1)[:, :3]
+
+        print(f"{backend}")
+        print(f"  - Query latency p50/p95: {np.percentile(latencies, 50):.1f} / {np.percentile(latencies, 95):.1f} ms")
+        print(f"  - Bulk throughput: {len(texts) / bulk_seconds:.1f} chunks/sec")
+
+        if reference is None:
+            reference = (chunk_vectors, top_k)
+            continue
+
+        cosine = np.sum(chunk_vectors * reference[0], axis=1)
+        same_top_k = np.mean([set(a) == set(b) for a, b in zip(top_k, reference[1])])
+        print(f"  - Cosine vs torch: mean {cosine.mean():.5f}, min {cosine.min():.5f}")
+        print(f"  - Same top-3 chunks as torch: {same_top_k:.0%} of questions")
+
+
+if __name__ == "__main__":
+    main()
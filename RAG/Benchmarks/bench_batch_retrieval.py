@@ -0,0 +1,82 @@
+"""
+Throughput (queries/sec) of retrieve_batch against sequential
+retrieve_relevant_chunks calls, as in evaluations and nightly re-answering.
+
+The corpus is random unit vectors, so no model is needed; the sequential
+calls' console output is discarded but still produced.
+
+Run from the project root:
+    python -m RAG.Benchmarks.bench_batch_retrieval --chunks 20000 --queries 2000
+    python -m RAG.Benchmarks.bench_batch_retrieval --backend chroma
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import numpy as np
+from RAG.RAG_steps.vector_store import NumpyVectorStore, ChromaVectorStore
+from RAG.RAG_steps.similarity import retrieve_relevant_chunks, retrieve_batch
+
+
+def open_store(backend, directory):
+    if backend == "numpy":
+        return NumpyVectorStore(directory)
+    import chromadb
+    client = chromadb.PersistentClient(path=directory)
+    return ChromaVectorStore(client.create_collection(name="bench"), client)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--backend", choices=["numpy", "chroma"], default="numpy")
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=256, help="queries per retrieve_batch call")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(args.chunks, args.dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = rng.normal(size=(args.queries, args.dim)).astype(np.float32)
+    ids = [f"chunk_{i}" for i in range(args.chunks)]
+
+    print("=" * 60)
+    print(f"{args.backend}: {args.chunks} chunks, {args.queries} queries, top {args.top_k}")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = open_store(args.backend, tmp)
+        batch = store.max_batch_size or 5000
+        for start in range(0, args.chunks, batch):
+            end = start + batch
+            store.upsert(ids[start:end], vectors[start:end], [f"text {i}" for i in range(start, min(end, args.chunks))],
+                         [{'source': "bench"}] * len(ids[start:end]))
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            sequential = [retrieve_relevant_chunks([query], store, args.top_k)['ids'][0] for query in queries]
+            sequential_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batched = []
+        for offset in range(0, args.queries, args.batch_size):
+            batched.extend(result['ids'] for result in
+                           retrieve_batch(queries[offset:offset + args.batch_size], store, args.top_k))
+        batched_seconds = time.perf_counter() - start
+
+    print(f"{'Sequential calls':>24}: {args.queries / sequential_seconds:9.1f} queries/sec")
+    print(f"{f'Batches of {args.batch_size}':>24}: {args.queries / batched_seconds:9.1f} queries/sec"
+          f"  x{sequential_seconds / batched_seconds:.1f}")
+    print(f"Same results: {sequential == batched}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Compare fixed-size batching with length-bucketed, token-budget batching.
+
+The corpus mixes what the system really embeds: full 500-character report
+chunks, short table rows / headers, and one-line chatbot questions, shuffled
+together in arrival order.
+
+Run from the project root:
+    python -m RAG.Benchmarks.bench_batching --texts 3000
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import numpy as np
+from RAG.RAG_steps.loading import load_documents_from_folder
+from RAG.RAG_steps.chunking import chunk_documents
+from RAG.RAG_steps.embeddings import get_embedder, embed_texts
+
+QUESTIONS = [
+    "What is Sara's diagnosis?",
+    "Which medication was Ali prescribed?",
+    "What was Fatima's last blood pressure reading?",
+    "Does Malik have any allergies?",
+]
+
+
+def build_corpus(folder, size, seed=0):
+    with contextlib.redirect_stdout(io.StringIO()):
+        chunks = [chunk['text'] for chunk in chunk_documents(load_documents_from_folder(folder))]
+    short = [line.strip() for text in chunks for line in text.splitlines() if len(line.strip()) > 10]
+
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(size):
+        kind = rng.random()
+        if kind < 0.5:
+            text = rng.choice(chunks)
+        elif kind < 0.8:
+            text = rng.choice(short)
+        else:
+            text = rng.choice(QUESTIONS)
+        corpus.append(f"{text} ({i})")
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--folder", default="Medical_reports")
+    parser.add_argument("--texts", type=int, default=2000)
+    args = parser.parse_args()
+
+    texts = build_corpus(args.folder, args.texts)
+    model = get_embedder()
+    lengths = [len(ids) for ids in model.tokenizer(texts)['input_ids']]
+    print("=" * 60)
+    print(f"{len(texts)} texts, tokens min/median/max: "
+          f"{min(lengths)}/{int(np.median(lengths))}/{max(lengths)}")
+    print("=" * 60)
+
+    # Warm up kernels before timing
+    model.encode(texts[:64], batch_size=32)
+
+    start = time.perf_counter()
+    reference = model.encode(texts, batch_size=32, show_progress_bar=False)
+    fixed_seconds = time.perf_counter() - start
+    print(f"{'Fixed batch_size=32':>28}: {fixed_seconds:6.2f}s  {len(texts) / fixed_seconds:8.1f} texts/sec")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        bucketed = embed_texts(texts, use_cache=False)
+        bucketed_seconds = time.perf_counter() - start
+    print(f"{'Token-budget buckets':>28}: {bucketed_seconds:6.2f}s  {len(texts) / bucketed_seconds:8.1f} texts/sec"
+          f"  x{fixed_seconds / bucketed_seconds:.2f}")
+
+    cosine = np.sum(reference * bucketed, axis=1) / (
+        np.linalg.norm(reference, axis=1) * np.linalg.norm(bucketed, axis=1))
+    print(f"Order restored: min cosine vs fixed batching = {cosine.min():.6f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Compare the character chunker with the token-aware chunker.
+
+For each strategy reports the number of chunks, how many of them exceed the
+embedding model's sequence length (and are silently truncated), the average
+tokens per chunk, and chunking / embedding throughput.
+
+Run from the project root:
+    python -m RAG.Benchmarks.bench_chunking --folder Medical_reports --repeat 20
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from RAG.RAG_steps.loading import load_documents_from_folder
+from RAG.RAG_steps.chunking import chunk_documents
+from RAG.RAG_steps.embeddings import get_embedder, get_token_budget
+
+
+def run(label, documents, model, max_tokens, **chunk_args):
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        chunks = chunk_documents(documents, **chunk_args)
+        chunk_seconds = time.perf_counter() - start
+
+    texts = [chunk['text'] for chunk in chunks]
+    token_counts = [len(ids) for ids in model.tokenizer(texts, add_special_tokens=False)['input_ids']]
+    truncated = sum(count > max_tokens for count in token_counts)
+
+    start = time.perf_counter()
+    model.encode(texts, batch_size=32)
+    embed_seconds = time.perf_counter() - start
+
+    print(f"{label}")
+    print(f"  - Chunks: {len(chunks)}")
+    print(f"  - Truncated by the model: {truncated}")
+    print(f"  - Avg tokens/chunk: {sum(token_counts) / max(len(chunks), 1):.1f} (budget {max_tokens})")
+    print(f"  - Chunking: {chunk_seconds * 1000:.1f} ms")
+    print(f"  - Embedding: {embed_seconds:.2f} s ({len(chunks) / embed_seconds:.1f} chunks/sec)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--folder", default="Medical_reports")
+    parser.add_argument("--repeat", type=int, default=10, help="repeat the corpus to make it larger")
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        documents = load_documents_from_folder(args.folder) * args.repeat
+
+    model = get_embedder()
+    tokenizer, max_tokens = get_token_budget(model)
+
+    print("=" * 60)
+    print(f"Chunking {len(documents)} documents")
+    print("=" * 60)
+    run("Characters (500 / overlap 50)", documents, model, max_tokens, chunk_size=500, overlap=50)
+    run(f"Tokens (sentence aligned, {max_tokens} tokens)", documents, model, max_tokens,
+        tokenizer=tokenizer, max_tokens=max_tokens)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Benchmark bulk embedding throughput (chunks/sec) from 1 to N worker processes.
+
+Chunks come from the sample reports, repeated until --chunks is reached.
+The embedding cache is bypassed so every run does real inference.
+
+Run from the project root:
+    python -m RAG.Benchmarks.bench_embedding_pool --chunks 4000 --max-workers 8
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from RAG.RAG_steps.loading import load_documents_from_folder
+from RAG.RAG_steps.chunking import chunk_documents
+from RAG.RAG_steps.embeddings import embed_texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--folder", default="Medical_reports")
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    parser.add_argument("--threads-per-worker", type=int, default=None,
+                        help="torch threads per worker (default: cores / workers)")
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        chunks = chunk_documents(load_documents_from_folder(args.folder))
+    texts = [chunk['text'] for chunk in chunks]
+    # Make repeated texts distinct so nothing is shared between runs
+    texts = [f"{texts[i % len(texts)]} [{i}]" for i in range(args.chunks)]
+
+    print("=" * 60)
+    print(f"Embedding {len(texts)} chunks")
+    print("=" * 60)
+
+    results = []
+    workers = 1
+    while workers <= args.max_workers:
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            if workers > 1:
+                # Start the workers and load the model in each before timing
+                embed_texts(texts[:workers * 64], use_cache=False, workers=workers,
+                            threads_per_worker=args.threads_per_worker)
+            else:
+                embed_texts(texts[:32], use_cache=False)
+
+            start = time.perf_counter()
+            embed_texts(texts, use_cache=False, workers=workers, threads_per_worker=args.threads_per_worker)
+            elapsed = time.perf_counter() - start
+
+        results.append((workers, elapsed))
+        print(f"{workers:>3} worker(s): {elapsed:7.2f}s  {len(texts) / elapsed:8.1f} chunks/sec"
+              f"  x{results[0][1] / elapsed:.2f}")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
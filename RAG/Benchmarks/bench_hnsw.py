@@ -0,0 +1,122 @@
+"""
+Tune the Chroma HNSW index: build time, memory, query latency and
+recall@k against exact search, for each combination of M, ef_construction
+and ef_search.
+
+The corpus is the sample reports' embeddings repeated with small noise up
+to --chunks (see bench_quantization), so the index sees the geometry of our
+data at the scale we plan for. Each combination is built in a fresh
+collection, because Chroma fixes the HNSW settings at creation.
+
+Run from the project root:
+    python -m RAG.Benchmarks.bench_hnsw --chunks 20000 --m 8 16 32 --ef-search 10 50 100
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import numpy as np
+from RAG.Benchmarks.bench_quantization import load_corpus
+from RAG.RAG_steps.vector_db import hnsw_metadata
+
+
+def exact_top_k(corpus, queries, k, space):
+    scores = queries @ corpus.T
+    if space == "l2":
+        # argmin |q - x|^2 = argmax (2 q.x - |x|^2)
+        scores = 2 * scores - np.sum(corpus * corpus, axis=1)[None, :]
+    elif space == "cosine":
+        scores = scores / np.linalg.norm(corpus, axis=1)[None, :]
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def resident_memory_mb():
+    """Resident set size of this process (Linux), or None elsewhere."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        return None
+
+
+def directory_mb(path):
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(path) for name in names) / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--folder", default="Medical_reports")
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--space", choices=["l2", "cosine", "ip"], default="l2")
+    parser.add_argument("--m", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--ef-construction", type=int, nargs="+", default=[100])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[10, 50, 100])
+    parser.add_argument("--synthetic", action="store_true",
+                        help="random unit vectors instead of report embeddings (no model needed)")
+    parser.add_argument("--dim", type=int, default=384, help="dimension of --synthetic vectors")
+    args = parser.parse_args()
+
+    import chromadb
+
+    rng = np.random.default_rng(0)
+    corpus, queries = load_corpus(args.folder, args.chunks, args.queries, args.synthetic, args.dim, rng)
+    ids = [f"chunk_{i}" for i in range(len(corpus))]
+    exact = exact_top_k(corpus, queries, args.k, args.space)
+
+    print("=" * 60)
+    print(f"{len(corpus)} chunks x {corpus.shape[1]} dims, {len(queries)} queries, "
+          f"recall@{args.k}, space {args.space}")
+    print("=" * 60)
+    print(f"{'M':>4} {'ef_c':>5} {'ef_s':>5} | {'build s':>8} {'disk MB':>8} {'RSS +MB':>8} | "
+          f"{'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} | {'recall':>6}")
+
+    for m in args.m:
+        for ef_construction in args.ef_construction:
+            for ef_search in args.ef_search:
+                directory = tempfile.mkdtemp()
+                client = None
+                try:
+                    client = chromadb.PersistentClient(path=directory)
+                    collection = client.create_collection(
+                        name="tuning", metadata=hnsw_metadata(args.space, m, ef_construction, ef_search))
+                    batch_size = client.get_max_batch_size() if hasattr(client, "get_max_batch_size") else 5000
+
+                    memory_before = resident_memory_mb()
+                    start = time.perf_counter()
+                    for offset in range(0, len(ids), batch_size):
+                        end = offset + batch_size
+                        collection.add(ids=ids[offset:end], embeddings=corpus[offset:end].tolist())
+                    build_seconds = time.perf_counter() - start
+                    memory_after = resident_memory_mb()
+
+                    collection.query(query_embeddings=queries[:1].tolist(), n_results=args.k)  # warm up
+                    latencies = []
+                    recalls = []
+                    for query, expected in zip(queries, exact):
+                        start = time.perf_counter()
+                        found = collection.query(query_embeddings=[query.tolist()], n_results=args.k,
+                                                 include=["distances"])['ids'][0]
+                        latencies.append((time.perf_counter() - start) * 1000)
+                        recalls.append(len({int(chunk_id.split("_")[1]) for chunk_id in found}
+                                           & set(expected.tolist())) / args.k)
+
+                    memory = f"{memory_after - memory_before:8.1f}" if memory_before is not None else f"{'n/a':>8}"
+                    print(f"{m:>4} {ef_construction:>5} {ef_search:>5} | {build_seconds:8.2f} "
+                          f"{directory_mb(directory):8.1f} {memory} | "
+                          f"{np.percentile(latencies, 50):7.2f} {np.percentile(latencies, 95):7.2f} "
+                          f"{np.percentile(latencies, 99):7.2f} | {np.mean(recalls):6.3f}")
+                finally:
+                    del client
+                    shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Latency of hybrid retrieval (BM25 + vector, fused with RRF) at scale.
+
+The corpus is synthetic: clinical-looking chunks drawn from a vocabulary of
+drug names, lab codes, values and filler words, with random unit vectors,
+so no model is needed. The NumPy vector store is used for the dense side.
+
+Run from the project root:
+    python -m RAG.Benchmarks.bench_hybrid --chunks 100000
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import numpy as np
+from RAG.RAG_steps.bm25 import BM25Index
+from RAG.RAG_steps.vector_store import NumpyVectorStore
+from RAG.RAG_steps.similarity import retrieve_relevant_chunks
+
+DRUGS = ["metformin", "lisinopril", "atorvastatin", "amoxicillin", "omeprazole", "warfarin", "insulin"]
+LABS = ["hba1c", "ldl", "hdl", "tsh", "alt", "ast", "creatinine", "ferritin"]
+PATIENTS = ["Ali", "Sara", "Fatima", "Malik"]
+FILLER = [f"word{i}" for i in range(5000)]
+
+
+def make_chunk(rng):
+    words = rng.choices(FILLER, k=rng.randint(40, 90))
+    words += rng.choices(DRUGS, k=rng.randint(0, 2)) + rng.choices(LABS, k=rng.randint(0, 2))
+    words.append(f"{rng.randint(1, 200)}.{rng.randint(0, 9)}")
+    rng.shuffle(words)
+    return " ".join(words)
+
+
+def percentiles(latencies):
+    return f"p50 {np.percentile(latencies, 50):6.2f} ms  p95 {np.percentile(latencies, 95):6.2f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    ids = [f"chunk_{i}" for i in range(args.chunks)]
+    texts = [make_chunk(rng) for _ in ids]
+    metadatas = [{'source': f"{PATIENTS[i % 4]}_report.pdf", 'patient': PATIENTS[i % 4]} for i in range(args.chunks)]
+    vectors = np.random.default_rng(0).normal(size=(args.chunks, args.dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    questions = [f"What is the {rng.choice(LABS)} and {rng.choice(DRUGS)} dose {rng.randint(1, 200)}.{rng.randint(0, 9)}?"
+                 for _ in range(args.queries)]
+    question_vectors = np.random.default_rng(1).normal(size=(args.queries, args.dim)).astype(np.float32)
+
+    print("=" * 60)
+    print(f"{args.chunks} chunks, {args.dim}-dim vectors, {args.queries} queries")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = BM25Index(os.path.join(tmp, "bm25.json"))
+        start = time.perf_counter()
+        for i in range(0, args.chunks, 1000):
+            index.add(ids[i:i + 1000], texts[i:i + 1000], metadatas[i:i + 1000])
+        print(f"BM25 build: {time.perf_counter() - start:.2f}s")
+
+        start = time.perf_counter()
+        index.save()
+        print(f"BM25 save: {time.perf_counter() - start:.2f}s "
+              f"({os.path.getsize(index.path) / (1024 * 1024):.1f} MB)")
+        start = time.perf_counter()
+        index = BM25Index(index.path)
+        print(f"BM25 load: {time.perf_counter() - start:.2f}s")
+
+        store = NumpyVectorStore(os.path.join(tmp, "store"))
+        for i in range(0, args.chunks, 5000):
+            store.upsert(ids[i:i + 5000], vectors[i:i + 5000], texts[i:i + 5000], metadatas[i:i + 5000])
+
+        # First search of each term compiles its postings; not part of steady state
+        for question in questions:
+            index.search(question, 20)
+            index.search(question, 20, {'patient': "Sara"})
+
+        for label, where in [("all patients", None), ("one patient", {'patient': "Sara"})]:
+            bm25, vector, hybrid = [], [], []
+            for question, question_vector in zip(questions, question_vectors):
+                start = time.perf_counter()
+                index.search(question, 20, where)
+                bm25.append((time.perf_counter() - start) * 1000)
+
+                start = time.perf_counter()
+                store.query([question_vector], 20, where)
+                vector.append((time.perf_counter() - start) * 1000)
+
+                with contextlib.redirect_stdout(io.StringIO()):
+                    start = time.perf_counter()
+                    retrieve_relevant_chunks([question_vector], store, 3, where,
+                                             query_text=question, keyword_index=index)
+                    hybrid.append((time.perf_counter() - start) * 1000)
+
+            print(f"{label}")
+            print(f"  - BM25 search:   {percentiles(bm25)}")
+            print(f"  - Vector search: {percentiles(vector)}")
+            print(f"  - Hybrid (RRF):  {percentiles(hybrid)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Import-time benchmark for the modules the Load and Chatbot pages import.
+
+Each page's imports are run in a fresh interpreter with `python -X importtime`
+and the self times of every imported module are summed. Pass --rev to also
+measure another git revision (e.g. the commit before the lazy handlers) for
+a before/after comparison.
+
+Run from the project root:
+    python -m RAG.Benchmarks.bench_import_time --rev HEAD~1 --repeat 5
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Module imports done at the top of each page (without streamlit itself,
+# which every page pays for anyway)
+PAGES = {
+    "Load": [
+        "RAG.RAG_steps.loading",
+        "RAG.RAG_steps.chunking",
+        "RAG.RAG_steps.ingestion",
+        "RAG.RAG_steps.vector_db",
+        "RAG.RAG_steps.embeddings",
+    ],
+    "Chatbot": [
+        "RAG.RAG_steps.embeddings",
+        "RAG.RAG_steps.similarity",
+        "RAG.RAG_steps.prompt",
+        "RAG.RAG_steps.call_llm",
+        "RAG.RAG_steps.vector_db",
+    ],
+}
+
+
+def measure(project_dir, modules):
+    """
+    Import `modules` in a fresh interpreter.
+    Returns: (total import time in ms, {top-level package: cumulative ms}),
+             or None when the imports fail
+    """
+    code = "\n".join(f"import {module}" for module in modules)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=project_dir, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        print(proc.stderr.strip().splitlines()[-1])
+        return None
+
+    total_us = 0
+    packages = {}
+    for line in proc.stderr.splitlines():
+        # "import time:      self [us] |  cumulative | imported package"
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        total_us += int(self_us)
+        if not name.startswith(" "):
+            continue
+        # Only top-level entries: nested imports are indented further
+        if name[1] != " ":
+            packages[name.strip()] = int(cumulative_us) / 1000
+    return total_us / 1000, packages
+
+
+def report(label, project_dir, repeat):
+    print("=" * 60)
+    print(f"Import time: {label}")
+    print("=" * 60)
+    for page, modules in PAGES.items():
+        runs = [measure(project_dir, modules) for _ in range(repeat)]
+        if any(run is None for run in runs):
+            print(f"{page:>8}: import failed")
+            continue
+        best_total, packages = min(runs, key=lambda run: run[0])
+        heaviest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:5]
+        print(f"{page:>8}: {best_total:8.1f} ms (best of {repeat})")
+        for name, ms in heaviest:
+            print(f"          {name:<40} {ms:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rev", help="git revision to compare against (e.g. HEAD~1)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.rev:
+        with tempfile.TemporaryDirectory() as folder:
+            archive = subprocess.run(["git", "archive", args.rev, "RAG"], cwd=ROOT,
+                                     capture_output=True, check=True)
+            subprocess.run(["tar", "-x", "-C", folder], input=archive.stdout, check=True)
+            report(f"{args.rev} (before)", folder, args.repeat)
+
+    report("working tree (after)", ROOT, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
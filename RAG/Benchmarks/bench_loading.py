@@ -0,0 +1,86 @@
+"""
+Benchmark parallel document extraction (pages/sec vs number of workers).
+
+Builds one large PDF by repeating the pages of the sample reports, then
+extracts it with 1..N worker processes.
+
+Run from the project root:
+    python -m RAG.Benchmarks.bench_loading --pages 400 --max-workers 8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from PyPDF2 import PdfReader, PdfWriter
+from RAG.RAG_steps import text_cache
+from RAG.RAG_steps.loading import load_documents_from_folder
+
+
+def build_corpus(source_folder, target_folder, pages, files):
+    """Write `files` PDFs of `pages` pages each, cycling through the sample reports."""
+    sample_pages = []
+    for name in sorted(os.listdir(source_folder)):
+        if name.lower().endswith(".pdf"):
+            sample_pages.extend(PdfReader(os.path.join(source_folder, name)).pages)
+
+    if not sample_pages:
+        raise SystemExit(f"No PDF found in {source_folder}")
+
+    for file_idx in range(files):
+        writer = PdfWriter()
+        for i in range(pages):
+            writer.add_page(sample_pages[i % len(sample_pages)])
+        with open(os.path.join(target_folder, f"report_{file_idx}.pdf"), "wb") as f:
+            writer.write(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--source", default="Medical_reports")
+    parser.add_argument("--pages", type=int, default=200, help="pages per generated PDF")
+    parser.add_argument("--files", type=int, default=4, help="number of generated PDFs")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    total_pages = args.pages * args.files
+    # Measure parsing, not cache hits
+    text_cache.CACHE_ENABLED = False
+
+    with tempfile.TemporaryDirectory() as folder:
+        build_corpus(args.source, folder, args.pages, args.files)
+
+        # Silence the per-file logging of the loader while timing
+        stdout = sys.stdout
+        results = []
+        try:
+            sys.stdout = open(os.devnull, "w")
+
+            start = time.perf_counter()
+            reference = load_documents_from_folder(folder)
+            results.append(("sequential", time.perf_counter() - start))
+
+            workers = 1
+            while workers <= args.max_workers:
+                start = time.perf_counter()
+                documents = load_documents_from_folder(folder, parallel=True, max_workers=workers)
+                results.append((f"{workers} workers", time.perf_counter() - start))
+                assert [d["content"] for d in documents] == [d["content"] for d in reference]
+                workers *= 2
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+
+    print("=" * 60)
+    print(f"Extraction of {args.files} PDFs x {args.pages} pages ({total_pages} pages)")
+    print("=" * 60)
+    baseline = results[0][1]
+    for label, elapsed in results:
+        print(f"{label:>12}: {elapsed:7.2f}s  {total_pages / elapsed:8.1f} pages/sec  x{baseline / elapsed:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Recall@k, memory and latency of the NumPy store's quantization modes.
+
+Chunks of the sample reports are embedded once (through the embedding cache)
+and, to reach --chunks, repeated with small noise so the corpus keeps the
+geometry of real report embeddings. Queries are the sample questions plus
+perturbed chunk vectors. Recall@k is measured against exact float32 search.
+
+Run from the project root:
+    python -m RAG.Benchmarks.bench_quantization --chunks 50000 --k 3 10
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import numpy as np
+from RAG.RAG_steps.vector_store import NumpyVectorStore, QUANTIZATIONS, RESCORE_FACTORS
+
+QUESTIONS = [
+    "What is Sara's diagnosis?",
+    "Which medication was Ali prescribed?",
+    "What was Fatima's last blood pressure reading?",
+    "Does Malik have any allergies?",
+    "Which tests came back outside the normal range?",
+]
+
+
+def normalize(vectors):
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def load_corpus(folder, size, queries, synthetic, dim, rng):
+    if synthetic:
+        base = normalize(rng.normal(size=(256, dim)).astype(np.float32))
+        question_vectors = normalize(rng.normal(size=(len(QUESTIONS), dim)).astype(np.float32))
+    else:
+        from RAG.RAG_steps.loading import load_documents_from_folder
+        from RAG.RAG_steps.chunking import chunk_documents
+        from RAG.RAG_steps.embeddings import embed_texts
+        with contextlib.redirect_stdout(io.StringIO()):
+            texts = [chunk['text'] for chunk in chunk_documents(load_documents_from_folder(folder))]
+            base = normalize(embed_texts(texts).astype(np.float32))
+            question_vectors = normalize(embed_texts(QUESTIONS).astype(np.float32))
+
+    picks = rng.integers(0, len(base), size)
+    corpus = normalize(base[picks] + rng.normal(scale=0.05, size=(size, base.shape[1])).astype(np.float32))
+    noisy = corpus[rng.integers(0, size, queries)] + rng.normal(scale=0.05, size=(queries, base.shape[1]))
+    return corpus, np.vstack([question_vectors, normalize(noisy.astype(np.float32))])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--folder", default="Medical_reports")
+    parser.add_argument("--chunks", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, nargs="+", default=[3, 10])
+    parser.add_argument("--synthetic", action="store_true",
+                        help="random unit vectors instead of report embeddings (no model needed)")
+    parser.add_argument("--dim", type=int, default=384, help="dimension of --synthetic vectors")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    corpus, queries = load_corpus(args.folder, args.chunks, args.queries, args.synthetic, args.dim, rng)
+    ids = [f"chunk_{i}" for i in range(len(corpus))]
+
+    print("=" * 60)
+    print(f"{len(corpus)} chunks x {corpus.shape[1]} dims, {len(queries)} queries")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = NumpyVectorStore(tmp)
+        for start in range(0, len(ids), 10000):
+            end = start + 10000
+            store.upsert(ids[start:end], corpus[start:end], [""] * len(ids[start:end]),
+                         [{'source': "bench"}] * len(ids[start:end]))
+
+        exact = {k: store.query(queries, k)['ids'] for k in args.k}
+        float32_bytes = corpus.nbytes
+
+        for quantization in [None] + list(QUANTIZATIONS):
+            store = NumpyVectorStore(tmp, quantization=quantization)
+            codes_bytes = store._codes[:len(ids)].nbytes if quantization else float32_bytes
+            label = quantization or "float32 (exact)"
+            rescore = f", rescoring top k x {RESCORE_FACTORS[quantization]}" if quantization else ""
+            print(f"{label}{rescore}")
+            print(f"  - Scanned codes: {codes_bytes / (1024 * 1024):7.1f} MB  "
+                  f"({float32_bytes / codes_bytes:.0f}x smaller than float32)")
+
+            for k in args.k:
+                store.query(queries[:5], k)  # warm up
+                latencies = []
+                found = []
+                for query in queries:
+                    start = time.perf_counter()
+                    found.append(store.query([query], k)['ids'][0])
+                    latencies.append((time.perf_counter() - start) * 1000)
+                recall = np.mean([len(set(a) & set(b)) / k for a, b in zip(found, exact[k])])
+                print(f"  - k={k:<3} recall@k {recall:.3f}   "
+                      f"p50 {np.percentile(latencies, 50):6.2f} ms  p95 {np.percentile(latencies, 95):6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
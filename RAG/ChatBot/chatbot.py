@@ -1,13 +1,20 @@
 import streamlit as st
 import os
-from RAG.RAG_steps.embeddings import embed_texts
+from RAG.RAG_steps.query_batcher import embed_query
 from RAG.RAG_steps.similarity import retrieve_relevant_chunks
+from RAG.RAG_steps.patients import detect_patient, patient_filter
+from RAG.RAG_steps.bm25 import get_keyword_index
+from RAG.RAG_steps.retrieval_cache import get_retrieval_cache
 from RAG.RAG_steps.prompt import prepare_prompt
-from RAG.RAG_steps.call_llm import generate_answer
-from RAG.RAG_steps.vector_db import get_db_collection
+from RAG.RAG_steps.call_llm import generate_answer, ERROR_PREFIX
+from RAG.RAG_steps.answer_cache import get_answer_cache
+from RAG.RAG_steps.vector_db import get_vector_store
 from dotenv import load_dotenv
 load_dotenv()
 
+#fuse BM25 keyword matches (drug names, lab codes, values) with the vector search
+HYBRID_SEARCH = True
+
 # st.write(os.getenv("DEEPSEEK_API_KEY"))
 
 if "messages" not in st.session_state:
@@ -18,15 +25,36 @@ def generate_response():
     user_msg = st.session_state.user_msg 
 
 
-    question_vector = embed_texts([st.session_state.user_msg])
+    # Batched together with the questions of other sessions arriving at the same time
+    question_vector = [embed_query(st.session_state.user_msg)]
 
-    #step 6: perform semantic / similarity search to get relevant chunks
-    result = retrieve_relevant_chunks(question_vector, st.session_state.rag_collection, 3) #pick only top 3
+    #step 6: perform semantic / similarity search to get relevant chunks,
+    #only among the chunks of the patient the question is about and the
+    #shared documents (multi-patient spreadsheets, policies)
+    patient = detect_patient(user_msg)
+    where = patient_filter(patient) if patient else None
+    keyword_index = get_keyword_index(st.session_state.rag_collection) if HYBRID_SEARCH else None
+    #repeated questions reuse the results until the Load page changes the collection
+    retrieval_cache = get_retrieval_cache()
+    result = retrieve_relevant_chunks(question_vector, st.session_state.rag_collection, 3, where,
+                                      query_text=user_msg, keyword_index=keyword_index,
+                                      cache=retrieval_cache) #pick only top 3
+    if where and not result['documents'][0]:
+        #documents ingested before patient metadata existed
+        result = retrieve_relevant_chunks(question_vector, st.session_state.rag_collection, 3,
+                                          query_text=user_msg, keyword_index=keyword_index,
+                                          cache=retrieval_cache)
 
-    #step 7: prepare a prompt
-    prompt = prepare_prompt(st.session_state.user_msg, result['documents'][0])   
-    #step 8: call deepseek and get an answer
-    answer = generate_answer(prompt, os.getenv("DEEPSEEK_API_KEY"))
+    #a rephrasing of an answered question with the same context reuses its answer
+    answer_cache = get_answer_cache()
+    answer = answer_cache.lookup(question_vector[0], result['ids'][0], result['documents'][0])
+    if answer is None:
+        #step 7: prepare a prompt
+        prompt = prepare_prompt(st.session_state.user_msg, result['documents'][0])   
+        #step 8: call deepseek and get an answer
+        answer = generate_answer(prompt, os.getenv("DEEPSEEK_API_KEY"))
+        if answer and not answer.startswith(ERROR_PREFIX):
+            answer_cache.put(question_vector[0], result['ids'][0], result['documents'][0], answer)
    
     st.session_state.messages.append({
         "role":"user",
@@ -55,11 +83,11 @@ st.title("ChatBot answer based on Our the Data of the patients🤖🩺")
 
 
 
-# Initialize the collection from ChromaDB if not in session state
+# Initialize the vector store if not in session state
 if "rag_collection" not in st.session_state:
-    # Try to load existing collection from ChromaDB
+    # Try to load the existing vector store (ChromaDB or NumPy)
     try:
-        st.session_state.rag_collection = get_db_collection()
+        st.session_state.rag_collection = get_vector_store()
         # Check if the collection has any data
         if st.session_state.rag_collection.count() == 0:
             st.warning("⚠️ No documents found in the database. Please upload documents in the Load page first.")
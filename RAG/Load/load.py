@@ -1,8 +1,29 @@
 import streamlit as st
-from RAG.RAG_steps.embeddings import embed_texts
-from RAG.RAG_steps.loading import load_documents_from_streamlit_files
-from RAG.RAG_steps.chunking import chunk_documents
-from RAG.RAG_steps.vector_db import get_db_collection
+from RAG.RAG_steps.loading import iter_documents_from_streamlit_files
+from RAG.RAG_steps.chunking import iter_chunk_documents
+from RAG.RAG_steps.ingestion import ingest_chunks
+from RAG.RAG_steps.vector_db import get_vector_store
+from RAG.RAG_steps.bm25 import get_keyword_index
+from RAG.RAG_steps.answer_cache import get_answer_cache
+from RAG.RAG_steps.embeddings import embedding_model_id, get_token_budget
+from RAG.RAG_steps.manifest import (
+    content_hash, ingestion_settings, load_manifest, save_manifest,
+    is_unchanged, reusable_ids, forget_file, record_file
+)
+
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 50
+#csv/xlsx/json rows are packed whole into chunks instead of one JSON dump
+TABULAR_MODE = True
+#"characters": CHUNK_SIZE characters with CHUNK_OVERLAP
+#"tokens": whole sentences up to the embedding model's max sequence length
+CHUNKING = "characters"
+#repeated boilerplate (letterheads, disclaimers) is embedded and stored once
+DEDUPLICATE = True
+#worker processes embedding each batch (1 = in this process)
+EMBED_WORKERS = 1
+#chunks embedded and stored together, enough to give every worker a share
+INGEST_BATCH_SIZE = 64 * EMBED_WORKERS
 
 
 
@@ -24,53 +45,88 @@ uploaded_files = st.file_uploader(
 if uploaded_files:
     st.success(f"✅ {len(uploaded_files)} file(s) uploaded successfully!")
 
-    #step 1: load existing files
-    source_list = load_documents_from_streamlit_files(uploaded_files)
-
-
-    #step2: chunk the contents
-    my_chunks_with_metadata = chunk_documents(source_list)
-    st.success(f"✂️ Step 2: Created {len(my_chunks_with_metadata)} chunks from documents")
-
-
-    #prepare data for storage
-
-    ids_list = [f"chunk_{i}" for i in range(len(my_chunks_with_metadata))]
-    text_list = []
-    metadata_list = []
-
-    for chunk in my_chunks_with_metadata:
-        text_list.append(chunk["text"])
-        metadata_list.append({
-            'source': chunk['source'],
-            'doc_id': chunk['doc_id'],
-            'chunk_id': chunk['chunk_id']
-        })
-
-    #step 3: generate embeddings
-    vectors_list = embed_texts(text_list)
-    st.success(f"🧮 Step 3: Generated embeddings for {len(vectors_list)} chunks")
+    my_rag_collection = get_vector_store()
+    #BM25 keyword index kept in sync with the vectors, for hybrid search
+    keyword_index = get_keyword_index(my_rag_collection)
+
+    #skip files already ingested with the same content and settings
+    manifest = load_manifest()
+    settings = ingestion_settings(CHUNK_SIZE, CHUNK_OVERLAP, embedding_model_id(), TABULAR_MODE, CHUNKING, DEDUPLICATE)
+    file_hashes = {}
+    files_to_process = []
+
+    for uploaded_file in uploaded_files:
+        file_hashes[uploaded_file.name] = content_hash(uploaded_file.getvalue())
+        if is_unchanged(manifest, uploaded_file.name, file_hashes[uploaded_file.name], settings, my_rag_collection):
+            continue
+        files_to_process.append(uploaded_file)
+
+    skipped_count = len(uploaded_files) - len(files_to_process)
+    if skipped_count:
+        st.info(f"⏭️ {skipped_count} file(s) unchanged since last ingestion, skipped")
+
+    summary = {'chunks': 0, 'unchanged': 0, 'sources': {}}
+    if files_to_process:
+        #step 1: stream the files (PDFs page by page, tables row by row)
+        documents = iter_documents_from_streamlit_files(files_to_process, split_pages=True, tabular=TABULAR_MODE)
+
+        #step2: chunk the contents lazily
+        tokenizer, max_tokens = get_token_budget() if CHUNKING == "tokens" else (None, None)
+        chunks = iter_chunk_documents(documents, CHUNK_SIZE, CHUNK_OVERLAP, tokenizer, max_tokens)
+
+        #step 3 + 4: generate embeddings and store into vector_db in bounded batches,
+        #embedding the next batch while the previous one is written
+        file_names = [uploaded_file.name for uploaded_file in files_to_process]
+        progress_bar = st.progress(0.0, text="Embedding and storing chunks...")
+
+        def show_progress(stored, source):
+            done = file_names.index(source) if source in file_names else 0
+            progress_bar.progress(done / len(file_names),
+                                  text=f"Stored {stored} chunks, reading {source} ({done + 1}/{len(file_names)} files)")
+
+        #changed files: chunks whose content is already stored are skipped
+        existing_ids = reusable_ids(manifest, file_names, settings, my_rag_collection)
+
+        summary = ingest_chunks(chunks, my_rag_collection, INGEST_BATCH_SIZE,
+                                deduplicate=DEDUPLICATE, embed_workers=EMBED_WORKERS, progress=show_progress,
+                                existing_ids=existing_ids, keyword_index=keyword_index)
+        progress_bar.progress(1.0, text=f"Stored {summary['chunks']} chunks from {len(file_names)} files")
+        st.success(f"✂️ Step 2: Created {summary['chunks'] + summary['unchanged']} chunks from documents")
+        st.success(f"🧮 Step 3: Generated embeddings for {summary['chunks']} chunks")
+        if summary['unchanged']:
+            st.info(f"♻️ {summary['unchanged']} chunk(s) unchanged since last ingestion, reused")
+
+        #drop the chunks that disappeared from the new versions of the files
+        #and the chatbot answers that were based on them
+        #files that produced no chunks (extraction failed) keep their old
+        #chunks and stay out of the manifest, so the next upload retries them
+        removed_ids = []
+        failed = [source for source in file_names if not summary['sources'].get(source)]
+        if failed:
+            st.warning(f"⚠️ No text could be extracted from: {', '.join(failed)}")
+        for source in file_names:
+            chunk_ids = summary['sources'].get(source)
+            if not chunk_ids:
+                continue
+            removed_ids += forget_file(manifest, source, my_rag_collection, keep=chunk_ids, keyword_index=keyword_index)
+            record_file(manifest, source, file_hashes[source], settings, chunk_ids)
+        get_answer_cache().invalidate(removed_ids)
+        save_manifest(manifest)
+        keyword_index.save()
 
-    #step 4: store into vector_db
-    my_rag_collection = get_db_collection()
-    my_rag_collection.upsert(
-            ids = ids_list,
-            embeddings = vectors_list,
-            documents = text_list,
-            metadatas = metadata_list
-        )
-    
     st.session_state.rag_collection = my_rag_collection
     st.success(f"🗄️ Step 4: Successfully added {my_rag_collection.count()} chunks into vector database")
 
     st.subheader("📊 Processing Summary")
-    col1, col2, col3, col4 = st.columns(4)
+    col1, col2, col3, col4, col5 = st.columns(5)
         
     with col1:
         st.metric("Original Files", len(uploaded_files))
     with col2:
-        st.metric("Loaded Documents", len(source_list))
+        st.metric("Skipped (unchanged)", skipped_count)
     with col3:
-        st.metric("Text Chunks", len(my_chunks_with_metadata))
+        st.metric("Processed Documents", len(summary['sources']))
     with col4:
+        st.metric("Text Chunks", summary['chunks'])
+    with col5:
         st.metric("Vector DB Entries", my_rag_collection.count())
\ No newline at end of file
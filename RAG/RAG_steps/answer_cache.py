@@ -0,0 +1,123 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+# Rephrasings of one question score ~0.9+, but so can two different
+# questions about the same patient ("diagnosis" / "prognosis"): keep it high
+SIMILARITY_THRESHOLD = 0.97
+TTL_SECONDS = 24 * 3600
+MAX_ANSWERS = 512
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+class AnswerCache:
+    """
+    In-memory semantic cache of LLM answers.
+    An answer is reused for a new question when its embedding has a cosine
+    similarity >= threshold with a question answered before AND the
+    retrieved context (chunk ids and texts) is identical, so the prompt
+    differs only by the wording of the question. Entries expire after
+    ttl_seconds, the least recently used are evicted above max_entries, and
+    invalidate() drops every answer built on chunks that were removed.
+    """
+
+    def __init__(self, threshold=SIMILARITY_THRESHOLD, ttl_seconds=TTL_SECONDS, max_entries=MAX_ANSWERS):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._by_context = {}
+        self._by_chunk = {}
+        self._context_chunks = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def context_key(chunk_ids, documents):
+        return hashlib.sha256("\0".join(list(chunk_ids) + list(documents)).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _unit(vector):
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def _remove(self, entry_id):
+        context, _, _, _ = self._entries.pop(entry_id)
+        entry_ids = self._by_context[context]
+        entry_ids.discard(entry_id)
+        if not entry_ids:
+            del self._by_context[context]
+            for chunk_id in self._context_chunks.pop(context):
+                contexts = self._by_chunk.get(chunk_id)
+                if contexts is not None:
+                    contexts.discard(context)
+                    if not contexts:
+                        del self._by_chunk[chunk_id]
+
+    def lookup(self, question_vector, chunk_ids, documents):
+        """Stored answer for a similar question with the same context, or None."""
+        context = self.context_key(chunk_ids, documents)
+        question = self._unit(question_vector)
+        now = time.time()
+        with self._lock:
+            best, best_similarity = None, self.threshold
+            for entry_id in list(self._by_context.get(context, ())):
+                _, vector, _, created = self._entries[entry_id]
+                if now - created > self.ttl_seconds:
+                    self._remove(entry_id)
+                    continue
+                similarity = float(vector @ question)
+                if similarity >= best_similarity:
+                    best, best_similarity = entry_id, similarity
+
+            if best is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(best)
+            return self._entries[best][2]
+
+    def put(self, question_vector, chunk_ids, documents, answer):
+        context = self.context_key(chunk_ids, documents)
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (context, self._unit(question_vector), answer, time.time())
+            self._by_context.setdefault(context, set()).add(entry_id)
+            self._context_chunks[context] = list(chunk_ids)
+            for chunk_id in chunk_ids:
+                self._by_chunk.setdefault(chunk_id, set()).add(context)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, chunk_ids):
+        """Drop the answers whose context used one of chunk_ids."""
+        with self._lock:
+            for chunk_id in chunk_ids:
+                for context in list(self._by_chunk.get(chunk_id, ())):
+                    for entry_id in list(self._by_context.get(context, ())):
+                        self._remove(entry_id)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self._entries)
+        }
+
+
+def get_answer_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AnswerCache()
+    return _cache
@@ -0,0 +1,238 @@
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+import numpy as np
+from RAG.RAG_steps.vector_store import matches
+
+# Kept next to the ingest manifest: wiping the database wipes the index too
+BM25_PATH = "./chroma_persist/bm25_index.json"
+K1 = 1.5
+B = 0.75
+
+# Keeps drug names, lab codes and values whole: "hba1c", "5.2", "120/80", "co-amoxiclav"
+_TOKEN = re.compile(r"[a-z0-9]+(?:[./-][a-z0-9]+)*")
+STOPWORDS = frozenset(
+    "a an and are as at be by did do does for from had has have he her his in is it its "
+    "of on or she that the their this to was were what when which who with".split()
+)
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def tokenize(text):
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Sparse keyword index over the stored chunks, kept next to the vectors.
+    Each chunk gets a slot; postings map a term to {slot: term frequency}.
+    Deleted slots are reused, so adding and removing chunks is incremental.
+    Postings are turned into NumPy arrays the first time a term is
+    searched, so a query only does a few vectorized operations over the
+    slots, whatever the number of chunks.
+    """
+
+    def __init__(self, path=BM25_PATH):
+        self.path = path
+        self.ids = []
+        self.metadatas = []
+        self.lengths = []
+        self.postings = {}
+        self._terms = []
+        self._slots = {}
+        self._free = []
+        self._total_length = 0
+        self._lock = threading.RLock()
+        self._compiled = {}
+        self._length_norms = None
+        self._masks = {}
+        # Bumped by every add and remove
+        self.version = 0
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Could not read keyword index {self.path}: {e}")
+            return
+
+        self.ids = data['ids']
+        self.metadatas = data['metadatas']
+        self.lengths = data['lengths']
+        self._terms = [[] for _ in self.ids]
+        for term, (slots, frequencies) in data['postings'].items():
+            self.postings[term] = dict(zip(slots, frequencies))
+            for slot in slots:
+                self._terms[slot].append(term)
+        for slot, chunk_id in enumerate(self.ids):
+            if chunk_id is None:
+                self._free.append(slot)
+            else:
+                self._slots[chunk_id] = slot
+        self._total_length = sum(self.lengths)
+
+    def save(self):
+        """Write the index atomically."""
+        with self._lock:
+            data = {
+                'ids': self.ids,
+                'metadatas': self.metadatas,
+                'lengths': self.lengths,
+                'postings': {term: [list(posting.keys()), list(posting.values())]
+                             for term, posting in self.postings.items()}
+            }
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            # dumps() uses the C encoder, dump() to a file does not
+            f.write(json.dumps(data, ensure_ascii=False))
+        os.replace(tmp_path, self.path)
+
+    def count(self):
+        return len(self._slots)
+
+    def _changed(self, terms):
+        self.version += 1
+        for term in terms:
+            self._compiled.pop(term, None)
+        self._length_norms = None
+        self._masks = {}
+
+    def add(self, ids, documents, metadatas):
+        """Index chunks; a chunk id already indexed is replaced."""
+        with self._lock:
+            self.remove([chunk_id for chunk_id in ids if chunk_id in self._slots])
+            for chunk_id, document, metadata in zip(ids, documents, metadatas):
+                counts = Counter(tokenize(document))
+                length = sum(counts.values())
+                if self._free:
+                    slot = self._free.pop()
+                    self.ids[slot] = chunk_id
+                    self.metadatas[slot] = metadata
+                    self.lengths[slot] = length
+                    self._terms[slot] = list(counts)
+                else:
+                    slot = len(self.ids)
+                    self.ids.append(chunk_id)
+                    self.metadatas.append(metadata)
+                    self.lengths.append(length)
+                    self._terms.append(list(counts))
+                self._slots[chunk_id] = slot
+                self._total_length += length
+                for term, frequency in counts.items():
+                    self.postings.setdefault(term, {})[slot] = frequency
+                self._changed(counts)
+
+    def update(self, ids, metadatas):
+        """Replace the metadata of indexed chunks (ids not indexed are skipped)."""
+        with self._lock:
+            for chunk_id, metadata in zip(ids, metadatas):
+                slot = self._slots.get(chunk_id)
+                if slot is not None:
+                    self.metadatas[slot] = metadata
+            self._changed(())
+
+    def remove(self, ids):
+        with self._lock:
+            for chunk_id in ids:
+                slot = self._slots.pop(chunk_id, None)
+                if slot is None:
+                    continue
+                for term in self._terms[slot]:
+                    posting = self.postings[term]
+                    del posting[slot]
+                    if not posting:
+                        del self.postings[term]
+                self._changed(self._terms[slot])
+                self._total_length -= self.lengths[slot]
+                self.ids[slot] = None
+                self.metadatas[slot] = None
+                self.lengths[slot] = 0
+                self._terms[slot] = []
+                self._free.append(slot)
+
+    def rebuild(self, collection, batch_size=1000):
+        """Index every chunk of `collection` (e.g. when the index file was lost)."""
+        everything = collection.get()
+        for start in range(0, len(everything['ids']), batch_size):
+            end = start + batch_size
+            self.add(everything['ids'][start:end], everything['documents'][start:end],
+                     everything['metadatas'][start:end])
+
+    def _mask(self, where):
+        key = json.dumps(where, sort_keys=True)
+        mask = self._masks.get(key)
+        if mask is None:
+            mask = np.array([metadata is not None and matches(metadata, where) for metadata in self.metadatas],
+                            dtype=bool)
+            self._masks[key] = mask
+        return mask
+
+    def search(self, query, n_results=10, where=None):
+        """
+        Rank chunks by BM25 score for `query`.
+        Returns: List of (chunk id, score), best first; only chunks sharing
+                 at least one term with the query are returned
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            count = len(self._slots)
+            if not count or not terms:
+                return []
+
+            if self._length_norms is None:
+                average_length = max(self._total_length / count, 1)
+                lengths = np.array(self.lengths, dtype=np.float32)
+                self._length_norms = K1 * (1 - B + B * lengths / average_length)
+
+            scores = np.zeros(len(self.ids), dtype=np.float32)
+            for term in terms:
+                posting = self.postings.get(term)
+                if not posting:
+                    continue
+                compiled = self._compiled.get(term)
+                if compiled is None:
+                    compiled = (np.fromiter(posting.keys(), dtype=np.int64, count=len(posting)),
+                                np.fromiter(posting.values(), dtype=np.float32, count=len(posting)))
+                    self._compiled[term] = compiled
+                slots, frequencies = compiled
+                idf = math.log(1 + (count - len(slots) + 0.5) / (len(slots) + 0.5))
+                scores[slots] += idf * frequencies * (K1 + 1) / (frequencies + self._length_norms[slots])
+
+            if where:
+                scores[~self._mask(where)] = 0
+
+            candidates = np.flatnonzero(scores)
+            if not candidates.size:
+                return []
+            k = min(n_results, candidates.size)
+            top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+            top = top[np.argsort(-scores[top])]
+            return [(self.ids[slot], float(scores[slot])) for slot in top]
+
+
+def get_keyword_index(collection=None):
+    """
+    The shared BM25 index. When it is empty but `collection` holds chunks
+    (index file deleted, data ingested before the index existed) it is
+    rebuilt from the collection.
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                index = BM25Index()
+                if collection is not None and not index.count() and collection.count():
+                    index.rebuild(collection)
+                    index.save()
+                _index = index
+    return _index
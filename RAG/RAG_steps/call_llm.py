@@ -1,5 +1,8 @@
 from openai import OpenAI
 
+# Start of the message returned instead of an answer when the call fails
+ERROR_PREFIX = "Error calling DeepSeek API"
+
 def generate_answer(prompt, api_key):
     """
     Generate answer using DeepSeek API.
@@ -41,6 +44,6 @@ def generate_answer(prompt, api_key):
         return answer
         
     except Exception as e:
-        error_msg = f"Error calling DeepSeek API: {e}"
+        error_msg = f"{ERROR_PREFIX}: {e}"
         print(f"✗ {error_msg}")
         return error_msg
\ No newline at end of file
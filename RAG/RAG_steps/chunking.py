@@ -1,46 +1,386 @@
-def chunk_text(text, chunk_size=500, overlap=50):
-    chunks = []
+import json
+import re
+from array import array
+
+# End of a sentence: terminal punctuation followed by whitespace, or a line break
+_SENTENCE_END = re.compile(r'[.!?]+(?=\s)|\n')
+
+
+def _check_chunk_params(chunk_size, overlap):
+    # start advances by chunk_size - overlap: it must move forward
+    if chunk_size <= 0:
+        raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+    if overlap < 0 or overlap >= chunk_size:
+        raise ValueError(f"overlap must be in [0, chunk_size), got {overlap} with chunk_size {chunk_size}")
+
+
+def chunk_offsets(text, chunk_size=500, overlap=50):
+    """
+    Compute chunk boundaries without copying the text.
+    Args:
+        text: Document text
+        chunk_size: Chunk size in characters
+        overlap: Overlap between consecutive chunks in characters
+    Yields: (start, end) of each chunk, with surrounding whitespace already
+            excluded so text[start:end] == chunk.strip()
+    """
+    _check_chunk_params(chunk_size, overlap)
     start = 0
 
     while start < len(text):
-        #GEt chunk
-        end = start + chunk_size
-        chunk = text[start:end]
+        end = min(start + chunk_size, len(text))
+
+        chunk_start, chunk_end = start, end
+        while chunk_start < chunk_end and text[chunk_start].isspace():
+            chunk_start += 1
+        while chunk_end > chunk_start and text[chunk_end - 1].isspace():
+            chunk_end -= 1
+
+        yield chunk_start, chunk_end
+        start += chunk_size - overlap
+
+
+def chunk_text(text, chunk_size=500, overlap=50):
+    return [text[start:end] for start, end in chunk_offsets(text, chunk_size, overlap)]
+
+
+def _strip_span(text, start, end):
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def _sentence_spans(text):
+    """(start, end) of each non-empty sentence of text."""
+    spans = []
+    start = 0
+    for match in _SENTENCE_END.finditer(text):
+        span = _strip_span(text, start, match.end())
+        if span[0] < span[1]:
+            spans.append(span)
+        start = match.end()
+    span = _strip_span(text, start, len(text))
+    if span[0] < span[1]:
+        spans.append(span)
+    return spans
+
+
+def token_chunk_offsets(text, tokenizer, max_tokens):
+    """
+    Pack whole sentences into chunks of at most max_tokens tokens.
+    All sentences of the text are tokenized in one batched call to the
+    (fast) tokenizer of the embedding model, so chunks fill the model's
+    sequence length without being truncated. A sentence longer than
+    max_tokens is cut on token boundaries.
+    Args:
+        text: Document text
+        tokenizer: Hugging Face tokenizer of the embedding model
+        max_tokens: Token budget per chunk (without special tokens)
+    Yields: (start, end) of each chunk in text
+    """
+    spans = _sentence_spans(text)
+    if not spans:
+        return
+
+    encoded = tokenizer(
+        [text[start:end] for start, end in spans],
+        add_special_tokens=False,
+        return_attention_mask=False,
+        return_token_type_ids=False,
+        return_offsets_mapping=True
+    )
+
+    chunk_start = chunk_end = None
+    chunk_tokens = 0
+
+    for (start, end), input_ids, offsets in zip(spans, encoded['input_ids'], encoded['offset_mapping']):
+        n_tokens = len(input_ids)
+
+        if chunk_start is not None and chunk_tokens + n_tokens > max_tokens:
+            yield chunk_start, chunk_end
+            chunk_start = None
+
+        if n_tokens > max_tokens:
+            # Oversized sentence: cut it every max_tokens tokens
+            for first in range(0, n_tokens, max_tokens):
+                last = min(first + max_tokens, n_tokens) - 1
+                yield _strip_span(text, start + offsets[first][0], start + offsets[last][1])
+            continue
+
+        if chunk_start is None:
+            chunk_start, chunk_tokens = start, 0
+        chunk_end = end
+        chunk_tokens += n_tokens
+
+    if chunk_start is not None:
+        yield chunk_start, chunk_end
+
+
+def _document_offsets(text, chunk_size, overlap, tokenizer=None, max_tokens=None):
+    if tokenizer is not None:
+        return token_chunk_offsets(text, tokenizer, max_tokens)
+    return chunk_offsets(text, chunk_size, overlap)
+
+
+def serialize_record(record):
+    """Compact one-line JSON for a table record (no indentation whitespace to embed)."""
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def chunk_records(records, chunk_size=500, overlap=50):
+    """
+    Pack whole table records into chunks of at most chunk_size characters.
+    A record longer than chunk_size (a wide row, a large JSON object) is
+    cut like text, with overlap, so the embedder sees all of it; each of
+    its pieces has row_start == row_end == that row.
+    Args:
+        records: Iterable of records (dicts or lists), consumed lazily
+        chunk_size: Chunk size in characters
+        overlap: Overlap between the pieces of an oversized record
+    Yields: (chunk_text, row_start, row_end), rows numbered from 1 and inclusive
+    """
+    lines = []
+    length = 0
+    row_start = 1
+
+    for row_number, record in enumerate(records, start=1):
+        line = serialize_record(record)
+
+        if len(line) > chunk_size:
+            if lines:
+                yield "\n".join(lines), row_start, row_number - 1
+                lines = []
+                length = 0
+            for start, end in chunk_offsets(line, chunk_size, overlap):
+                yield line[start:end], row_number, row_number
+            continue
 
-        chunks.append(chunk.strip())
-        start = end - overlap 
+        # +1 for the newline joining it to the previous record
+        if lines and length + 1 + len(line) > chunk_size:
+            yield "\n".join(lines), row_start, row_number - 1
+            lines = []
+            length = 0
 
-    return chunks
+        if not lines:
+            row_start = row_number
+            length = len(line)
+        else:
+            length += 1 + len(line)
+        lines.append(line)
 
+    if lines:
+        yield "\n".join(lines), row_start, row_start + len(lines) - 1
+
+
+def iter_chunk_documents(documents, chunk_size=500, overlap=50, tokenizer=None, max_tokens=None):
+    """
+    Lazily chunk a stream of documents.
+    Consecutive documents with the same source (e.g. the page segments of a
+    PDF) are treated as one document: they share a doc_id and their
+    chunk_ids keep counting up. Tabular documents (with 'records') are
+    packed by whole rows, and their chunks record 'row_start'/'row_end'.
+    Args:
+        documents: Iterable of document dictionaries (may be a generator)
+        chunk_size: Chunk size in characters
+        overlap: Overlap between consecutive chunks in characters
+        tokenizer, max_tokens: When given, text is packed by sentences up to
+                               max_tokens tokens instead of by characters
+                               (see embeddings.get_token_budget)
+    Yields: Chunk dictionaries, one at a time
+    """
+    _check_chunk_params(chunk_size, overlap)
 
-def chunk_documents(documents, chunk_size=500, overlap=50):
     print("\n" + "=" * 25)
     print("STEP 2: Chunking Documents")
     print("=" * 25)
-    print(f"Chunk size: {chunk_size} characters")
-    print(f"Overlap: {overlap} characters")
+    if tokenizer is not None:
+        print(f"Chunk size: {max_tokens} tokens (sentence aligned)")
+    else:
+        print(f"Chunk size: {chunk_size} characters")
+        print(f"Overlap: {overlap} characters")
 
-    all_chunks = []
+    doc_idx = -1
+    current_source = None
+    doc_chunks = 0
+    total_chunks = 0
 
-    for doc_idx, doc in enumerate(documents):
-        #chunk the document
-        chunks = chunk_text(doc['content'], chunk_size,overlap)
+    for doc in documents:
+        if doc['source'] != current_source:
+            if current_source is not None:
+                print(f"Document {doc_idx + 1}: {current_source}")
+                print(f"  - Created {doc_chunks} chunks")
+            doc_idx += 1
+            current_source = doc['source']
+            doc_chunks = 0
+
+        #chunk the document: tables by whole records, text by characters
+        if 'records' in doc:
+            chunks = chunk_records(doc['records'], chunk_size, overlap)
+        else:
+            text = doc['content']
+            chunks = (
+                (text[start:end], None, None)
+                for start, end in _document_offsets(text, chunk_size, overlap, tokenizer, max_tokens)
+            )
 
         #Add metadata to each chunk
+        try:
+            for chunk, row_start, row_end in chunks:
+                chunk_dict = {
+                    'text': chunk,
+                    'source': doc['source'],
+                    'doc_id': doc_idx,
+                    'chunk_id': doc_chunks,
+                    'chunk_length': len(chunk)
+                }
+                if 'page' in doc:
+                    chunk_dict['page'] = doc['page']
+                if row_start is not None:
+                    chunk_dict['row_start'] = row_start
+                    chunk_dict['row_end'] = row_end
+
+                doc_chunks += 1
+                total_chunks += 1
+                yield chunk_dict
+        except Exception as e:
+            # Table rows are read lazily, so a malformed file only fails here
+            print(f"Error reading {doc['source']}: {e}")
+
+    if current_source is not None:
+        print(f"Document {doc_idx + 1}: {current_source}")
+        print(f"  - Created {doc_chunks} chunks")
+
+    print(f"\nTotal chunks created: {total_chunks}")
+
+
+def chunk_documents(documents, chunk_size=500, overlap=50, tokenizer=None, max_tokens=None):
+    return list(iter_chunk_documents(documents, chunk_size, overlap, tokenizer, max_tokens))
+
+
+class ChunkTable:
+    """
+    Compact chunk storage for large corpora.
+    Each document text and source is stored once; a chunk is only three
+    integers in parallel arrays (segment, start, end). Chunk text and the
+    chunk dictionary are materialised on access, e.g. while iterating the
+    table to embed and upsert it.
+    """
+
+    def __init__(self):
+        self.sources = []
+        self._source_index = {}
+
+        # Per segment (a document, a PDF page, or one packed table chunk)
+        self._segment_text = []
+        self._segment_source = array('I')
+        self._segment_page = array('i')
+        self._segment_row_start = array('i')
+        self._segment_row_end = array('i')
+        self._segment_first_chunk = array('I')
+        self._segment_first_chunk_id = array('I')
+        self._chunks_per_source = array('I')
+
+        # Per chunk
+        self._chunk_segment = array('I')
+        self._chunk_start = array('I')
+        self._chunk_end = array('I')
+
+    def __len__(self):
+        return len(self._chunk_segment)
+
+    def _add_segment(self, source_idx, text, page=-1, row_start=-1, row_end=-1):
+        self._segment_text.append(text)
+        self._segment_source.append(source_idx)
+        self._segment_page.append(page)
+        self._segment_row_start.append(row_start)
+        self._segment_row_end.append(row_end)
+        self._segment_first_chunk.append(len(self._chunk_segment))
+        self._segment_first_chunk_id.append(self._chunks_per_source[source_idx])
+        return len(self._segment_text) - 1
+
+    def _add_chunk(self, segment, source_idx, start, end):
+        self._chunk_segment.append(segment)
+        self._chunk_start.append(start)
+        self._chunk_end.append(end)
+        self._chunks_per_source[source_idx] += 1
+
+    def add_document(self, doc, chunk_size=500, overlap=50, tokenizer=None, max_tokens=None):
+        """Chunk one document (or page segment) into the table. Returns the number of chunks added."""
+        source = doc['source']
+        if source not in self._source_index:
+            self._source_index[source] = len(self.sources)
+            self.sources.append(source)
+            self._chunks_per_source.append(0)
+        source_idx = self._source_index[source]
+        added = len(self)
+
+        if 'records' in doc:
+            # Packed table chunks are not slices of one text: one segment each
+            for chunk, row_start, row_end in chunk_records(doc['records'], chunk_size, overlap):
+                segment = self._add_segment(source_idx, chunk, row_start=row_start, row_end=row_end)
+                self._add_chunk(segment, source_idx, 0, len(chunk))
+        else:
+            text = doc['content']
+            segment = self._add_segment(source_idx, text, page=doc.get('page', -1))
+            for start, end in _document_offsets(text, chunk_size, overlap, tokenizer, max_tokens):
+                self._add_chunk(segment, source_idx, start, end)
+
+        return len(self) - added
+
+    def text(self, i):
+        """Materialise the text of chunk i."""
+        return self._segment_text[self._chunk_segment[i]][self._chunk_start[i]:self._chunk_end[i]]
+
+    def chunk(self, i):
+        """Materialise chunk i as the same dictionary chunk_documents produces."""
+        segment = self._chunk_segment[i]
+        text = self.text(i)
+        chunk_dict = {
+            'text': text,
+            'source': self.sources[self._segment_source[segment]],
+            'doc_id': self._segment_source[segment],
+            'chunk_id': self._segment_first_chunk_id[segment] + i - self._segment_first_chunk[segment],
+            'chunk_length': len(text)
+        }
+        if self._segment_page[segment] >= 0:
+            chunk_dict['page'] = self._segment_page[segment]
+        if self._segment_row_start[segment] >= 0:
+            chunk_dict['row_start'] = self._segment_row_start[segment]
+            chunk_dict['row_end'] = self._segment_row_end[segment]
+        return chunk_dict
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.chunk(i)
+
+
+def chunk_documents_compact(documents, chunk_size=500, overlap=50, tokenizer=None, max_tokens=None):
+    """
+    Chunk documents into a ChunkTable instead of a list of dictionaries.
+    Args:
+        documents: Iterable of document dictionaries (may be a generator)
+        chunk_size: Chunk size in characters
+        overlap: Overlap between consecutive chunks in characters
+        tokenizer, max_tokens: Pack by sentences up to max_tokens tokens
+    Returns: ChunkTable
+    """
+    _check_chunk_params(chunk_size, overlap)
+
+    print("\n" + "=" * 25)
+    print("STEP 2: Chunking Documents (compact table)")
+    print("=" * 25)
+    print(f"Chunk size: {chunk_size} characters")
+    print(f"Overlap: {overlap} characters")
+
+    table = ChunkTable()
+    for doc in documents:
+        try:
+            table.add_document(doc, chunk_size, overlap, tokenizer, max_tokens)
+        except Exception as e:
+            print(f"Error reading {doc['source']}: {e}")
 
-        for chunk_idx, chunk in enumerate(chunks):
-           all_chunks.append({
-                'text': chunk,
-                'source': doc['source'],
-                'doc_id': doc_idx,
-                'chunk_id': chunk_idx,
-                'chunk_length': len(chunk)
-            })
-           
-        print(f"Document {doc_idx + 1}: {doc['source']}")
-        print(f"  - Created {len(chunks)} chunks")
-
-    print(f"\nTotal chunks created: {len(all_chunks)}")
-
-    return all_chunks
-    
\ No newline at end of file
+    print(f"\nDocuments: {len(table.sources)}")
+    print(f"Total chunks created: {len(table)}")
+    return table
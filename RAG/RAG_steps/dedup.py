@@ -0,0 +1,127 @@
+import hashlib
+import random
+import re
+
+_WHITESPACE = re.compile(r"\s+")
+_NUMBER = re.compile(r"\d+(?:[.,/:]\d+)*")
+
+# MinHash over 3-word shingles with LSH banding: chunks of the same source
+# sharing all rows of at least one band become candidates, and candidates
+# whose estimated Jaccard similarity reaches NEAR_DUPLICATE_THRESHOLD and
+# that carry the same numbers are treated as duplicates.
+SHINGLE_SIZE = 3
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+NEAR_DUPLICATE_THRESHOLD = 0.8
+# Shorter chunks ("Page 1", a lone header) only match exactly
+MIN_WORDS_FOR_NEAR_DUPLICATE = 8
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(42)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERMUTATIONS)]
+
+
+def normalize_text(text):
+    return _WHITESPACE.sub(" ", text).strip().lower()
+
+
+def minhash(words):
+    """MinHash signature of the word shingles of a text."""
+    shingles = {
+        int.from_bytes(hashlib.blake2b(" ".join(words[i:i + SHINGLE_SIZE]).encode("utf-8"), digest_size=8).digest(), "big")
+        for i in range(max(len(words) - SHINGLE_SIZE + 1, 1))
+    }
+    return tuple(min((a * h + b) % _PRIME for h in shingles) for a, b in _PERMUTATIONS)
+
+
+def _bands(source, signature):
+    return [
+        (source, band, signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND])
+        for band in range(BANDS)
+    ]
+
+
+def _similarity(signature, other):
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    return sum(x == y for x, y in zip(signature, other)) / NUM_PERMUTATIONS
+
+
+class Deduplicator:
+    """
+    Drops exact and near-duplicate chunks from a chunk stream.
+    The first occurrence of a text is kept; the sources of its duplicates
+    are collected so they can be recorded on the kept chunk once the whole
+    stream has been stored (see ingestion.ingest_chunks).
+    Exact duplicates are collapsed across sources. Near duplicates only
+    within one source and only when their numbers are identical: two lab
+    panels differing by one value ("Hemoglobin 14.2" / "9.1") are two
+    results, not one.
+    With `partition` (callable source -> key, e.g. the patient a file
+    belongs to) chunks only collapse with chunks whose source has the same
+    key, so the kept copy's metadata is right for every source it stands for.
+    """
+
+    def __init__(self, threshold=NEAR_DUPLICATE_THRESHOLD, partition=None):
+        self.threshold = threshold
+        self.partition = partition
+        self.kept = []
+        self.duplicate_sources = {}
+        self._exact = {}
+        self._bands = {}
+        self._signatures = []
+        self.exact_duplicates = 0
+        self.near_duplicates = 0
+
+    def _find(self, normalized, source):
+        """Index of the kept chunk `normalized` duplicates, or None. Registers it otherwise."""
+        digest = hashlib.sha1(normalized.encode("utf-8")).digest()
+        if self.partition is not None:
+            digest = (self.partition(source), digest)
+        if digest in self._exact:
+            self.exact_duplicates += 1
+            return self._exact[digest]
+
+        words = normalized.split()
+        signature = minhash(words) if len(words) >= MIN_WORDS_FOR_NEAR_DUPLICATE else None
+        numbers = _NUMBER.findall(normalized)
+
+        if signature is not None:
+            candidates = set()
+            for band in _bands(source, signature):
+                candidates.update(self._bands.get(band, ()))
+            for index in sorted(candidates):
+                other_signature, other_numbers = self._signatures[index]
+                if other_numbers == numbers and _similarity(signature, other_signature) >= self.threshold:
+                    self.near_duplicates += 1
+                    return index
+
+        index = len(self.kept)
+        self._exact[digest] = index
+        self._signatures.append((signature, numbers))
+        if signature is not None:
+            for band in _bands(source, signature):
+                self._bands.setdefault(band, []).append(index)
+        return None
+
+    def unique(self, chunks):
+        """Yield only the chunks that do not duplicate an earlier one."""
+        for chunk in chunks:
+            index = self._find(normalize_text(chunk['text']), chunk['source'])
+            if index is None:
+                # Everything but the text, so the stream stays memory bounded
+                self.kept.append({key: value for key, value in chunk.items() if key != 'text'})
+                yield chunk
+                continue
+
+            kept = self.kept[index]
+            if chunk['source'] != kept['source']:
+                sources = self.duplicate_sources.setdefault(index, [])
+                if chunk['source'] not in sources:
+                    sources.append(chunk['source'])
+
+    def merged_sources(self):
+        """Yield (kept chunk, all sources it stands for) for chunks that absorbed duplicates."""
+        for index, sources in self.duplicate_sources.items():
+            kept = self.kept[index]
+            yield kept, [kept['source']] + sources
@@ -0,0 +1,122 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import numpy as np
+
+CACHE_PATH = "./cache/embeddings.sqlite3"
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _normalize(text):
+    # Runs of whitespace do not change the tokens the model sees
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+class EmbeddingCache:
+    """
+    Persistent embedding cache in SQLite.
+    Vectors are keyed by model name + hash of the normalized text, with
+    least recently used entries evicted above max_bytes. Hit and miss
+    counters are kept for the lifetime of the process.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_bytes=MAX_CACHE_BYTES):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # Streamlit sessions run in threads of one process: one shared
+        # connection, serialized with a lock
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self._db.commit()
+        self._bytes = self._db.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+
+    @staticmethod
+    def key(model_name, text):
+        return hashlib.sha256(f"{model_name}\0{_normalize(text)}".encode("utf-8")).hexdigest()
+
+    def get_many(self, model_name, texts):
+        """
+        Look up the embeddings of texts.
+        Returns: Dictionary index in texts -> float32 vector, for cache hits only
+        """
+        keys = [self.key(model_name, text) for text in texts]
+        found = {}
+        with self._lock:
+            # SQLite limits the number of bound parameters per statement
+            for start in range(0, len(keys), 500):
+                batch = list(set(keys[start:start + 500]))
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                    batch
+                ).fetchall()
+                found.update(rows)
+
+            if found:
+                now = time.time()
+                self._db.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?",
+                                     [(now, key) for key in found])
+                self._db.commit()
+
+            vectors = {}
+            for i, key in enumerate(keys):
+                if key in found:
+                    vectors[i] = np.frombuffer(found[key], dtype=np.float32)
+            self.hits += len(vectors)
+            self.misses += len(keys) - len(vectors)
+        return vectors
+
+    def put_many(self, model_name, texts, vectors):
+        """Store the embeddings of texts, then evict old entries above max_bytes."""
+        now = time.time()
+        rows = [
+            (self.key(model_name, text), np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for text, vector in zip(texts, vectors)
+        ]
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)", rows)
+            self._db.commit()
+            self._bytes += sum(len(row[1]) for row in rows)
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        self._bytes = self._db.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+        while self._bytes > self.max_bytes:
+            rows = self._db.execute(
+                "SELECT key, LENGTH(vector) FROM embeddings ORDER BY last_used LIMIT 500"
+            ).fetchall()
+            if not rows:
+                break
+            evicted = []
+            for key, size in rows:
+                if self._bytes <= self.max_bytes:
+                    break
+                evicted.append((key,))
+                self._bytes -= size
+            self._db.executemany("DELETE FROM embeddings WHERE key = ?", evicted)
+        self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': entries,
+                'bytes': self._bytes
+            }
@@ -1,28 +1,247 @@
-from sentence_transformers import SentenceTransformer
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
+from RAG.RAG_steps.embedding_cache import EmbeddingCache
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+# Inference backend of the embedding model:
+#   "torch"     - PyTorch fp32 (reference)
+#   "onnx"      - ONNX Runtime export of the same model
+#   "onnx-int8" - ONNX Runtime, dynamically quantized int8 weights
+# The ONNX backends need `pip install sentence-transformers[onnx]`.
+EMBED_BACKEND = os.getenv("RAG_EMBED_BACKEND", "torch")
+# Quantized export shipped in the model repository (AVX2 runs on any recent x86 CPU)
+ONNX_INT8_FILE = "onnx/model_quint8_avx2.onnx"
+
+# Local copy of the model files (see bundle_model), used instead of the
+# Hugging Face hub when present
+MODEL_REPO = f"sentence-transformers/{MODEL_NAME}"
+MODEL_DIR = os.path.join("models", MODEL_NAME)
+
+# Below this many texts, shipping them to worker processes costs more than it saves
+MIN_TEXTS_PER_WORKER = 64
+
+# Padded tokens per encode call: short texts go in large batches, long ones
+# in small batches, instead of a fixed 32 texts padded to the longest one
+MAX_BATCH_TOKENS = 8192
+MAX_BATCH_SIZE = 256
 
 _model = None
+_model_lock = threading.Lock()
+_cache = None
+_pool = None
+_pool_config = None
+
+def load_embedder(model_name=MODEL_NAME, backend=EMBED_BACKEND, threads=None):
+    """
+    Load a new SentenceTransformer instance running on the given backend.
+    Args:
+        model_name: Model name or local path
+        backend: "torch", "onnx" or "onnx-int8" (see EMBED_BACKEND)
+        threads: Intra-op threads for ONNX Runtime (None = runtime default)
+    """
+    if model_name == MODEL_NAME and os.path.isdir(MODEL_DIR):
+        model_name = MODEL_DIR
+        # Bundled model: never reach out to the hub (read when huggingface_hub is imported)
+        os.environ.setdefault("HF_HUB_OFFLINE", "1")
+
+    # Imported here: sentence_transformers pulls in torch, which should
+    # only be paid for when a page actually embeds something.
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "torch":
+        return SentenceTransformer(model_name)
+    if backend not in ("onnx", "onnx-int8"):
+        raise ValueError(f"Unknown embedding backend: {backend}")
+
+    model_kwargs = {}
+    if backend == "onnx-int8":
+        model_kwargs["file_name"] = ONNX_INT8_FILE
+    if threads:
+        import onnxruntime
+        session_options = onnxruntime.SessionOptions()
+        session_options.intra_op_num_threads = threads
+        model_kwargs["session_options"] = session_options
+    return SentenceTransformer(model_name, backend="onnx", model_kwargs=model_kwargs)
 
-def get_embedder(model_name="all-MiniLM-L6-v2"):
+def get_embedder(model_name=MODEL_NAME):
     global _model
     if _model is None:
-        _model = SentenceTransformer(model_name)
+        # The warm-up thread and a page may ask at the same time: load once
+        with _model_lock:
+            if _model is None:
+                _model = load_embedder(model_name, EMBED_BACKEND)
     return _model
 
-def embed_texts(texts):
-    """Return list of vectors (numpy arrays) for a list of texts."""
+def bundle_model(target_dir=MODEL_DIR):
+    """Download the model files (including the ONNX exports) into target_dir."""
+    from huggingface_hub import snapshot_download
 
+    snapshot_download(
+        repo_id=MODEL_REPO,
+        local_dir=target_dir,
+        allow_patterns=["*.json", "*.txt", "*.safetensors", "1_Pooling/*",
+                        "onnx/model.onnx", ONNX_INT8_FILE]
+    )
+    return target_dir
+
+def embedding_model_id():
+    """Identity of the vectors produced (model + backend), used by the embedding cache and the ingestion manifest."""
+    return MODEL_NAME if EMBED_BACKEND == "torch" else f"{MODEL_NAME}:{EMBED_BACKEND}"
+
+def get_token_budget(model=None):
+    """
+    Tokenizer of the embedding model and the number of content tokens it
+    embeds without truncation (max_seq_length minus [CLS] and [SEP]).
+    """
+    model = model or get_embedder()
+    return model.tokenizer, model.max_seq_length - 2
+
+def get_embedding_cache():
+    global _cache
+    if _cache is None:
+        _cache = EmbeddingCache()
+    return _cache
+
+def plan_batches(lengths, max_batch_tokens=MAX_BATCH_TOKENS, max_batch_size=MAX_BATCH_SIZE):
+    """
+    Group texts of similar length into batches sized by a token budget.
+    Texts are sorted longest first, so the first text of a batch sets its
+    padded length, and a batch grows while batch_size * padded_length
+    stays within max_batch_tokens.
+    Args:
+        lengths: Token length of each text
+    Returns: List of batches, each a list of indices into lengths
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True)
+    batches = []
+    current = []
+
+    for i in order:
+        padded_length = lengths[current[0]] if current else lengths[i]
+        if current and ((len(current) + 1) * padded_length > max_batch_tokens
+                        or len(current) >= max_batch_size):
+            batches.append(current)
+            current = []
+        current.append(i)
+
+    if current:
+        batches.append(current)
+    return batches
+
+def _encode(texts, show_progress=True):
     model = get_embedder()
 
-    # Create embeddings
-    embeddings = model.encode(
-        texts,
-        show_progress_bar=True,
-        batch_size=32
-        )
+    # Token lengths (as the model will see them) in one fast-tokenizer call
+    lengths = [
+        len(ids) for ids in model.tokenizer(
+            list(texts), truncation=True, max_length=model.max_seq_length,
+            return_attention_mask=False, return_token_type_ids=False
+        )['input_ids']
+    ]
+    batches = plan_batches(lengths)
+    if show_progress:
+        print(f"Embedding {len(texts)} texts in {len(batches)} length-bucketed batches")
+
+    # Create embeddings, batch by batch, written back at their original index
+    embeddings = None
+    for batch in batches:
+        vectors = model.encode(
+            [texts[i] for i in batch],
+            show_progress_bar=False,
+            batch_size=len(batch)
+            )
+        if embeddings is None:
+            embeddings = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+        embeddings[batch] = vectors
+
+    if embeddings is None:
+        embeddings = np.empty((0, model.get_sentence_embedding_dimension()), dtype=np.float32)
     
     # print(f"✓ Embeddings created")
     # print(f"  - Shape: {embeddings.shape}")
     # print(f"  - Each chunk is now a {embeddings.shape[1]}-dimensional vector")
     
+    return embeddings
+
+def _init_worker(model_name, threads):
+    # Each worker holds its own copy of the model and a fixed share of the cores
+    global _model
+    import torch
+    torch.set_num_threads(threads)
+    _model = load_embedder(model_name, EMBED_BACKEND, threads)
+
+def _encode_shard(texts):
+    return _encode(texts, show_progress=False)
+
+def get_embedding_pool(workers, threads_per_worker=None):
+    """
+    Process pool for bulk embedding, kept alive between calls so the model
+    is loaded once per worker.
+    Args:
+        workers: Number of worker processes
+        threads_per_worker: Torch threads per worker (default: cores / workers)
+    """
+    global _pool, _pool_config
+    threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+    config = (workers, threads_per_worker)
+
+    if _pool is None or _pool_config != config:
+        if _pool is not None:
+            _pool.shutdown()
+        # spawn: forking a process that already runs torch threads can deadlock
+        _pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(MODEL_NAME, threads_per_worker)
+        )
+        _pool_config = config
+    return _pool
+
+def _encode_parallel(texts, workers, threads_per_worker=None):
+    """Shard texts across the worker pool and reassemble the vectors in order."""
+    pool = get_embedding_pool(workers, threads_per_worker)
+
+    # A few shards per worker keeps all of them busy until the end
+    shard_size = max(MIN_TEXTS_PER_WORKER // 2, -(-len(texts) // (workers * 4)))
+    futures = [
+        pool.submit(_encode_shard, texts[start:start + shard_size])
+        for start in range(0, len(texts), shard_size)
+    ]
+    print(f"Embedding {len(texts)} texts with {workers} worker processes ({len(futures)} shards)")
+    return np.concatenate([future.result() for future in futures])
+
+def embed_texts(texts, use_cache=True, workers=1, threads_per_worker=None):
+    """Return list of vectors (numpy arrays) for a list of texts.
+    Texts already embedded (by this model) are read from the embedding
+    cache; the model is only loaded and run for the misses.
+    With workers > 1, large batches of misses are encoded by a pool of
+    worker processes (see get_embedding_pool)."""
+
+    def encode(to_encode):
+        if workers > 1 and len(to_encode) >= workers * MIN_TEXTS_PER_WORKER:
+            return _encode_parallel(to_encode, workers, threads_per_worker)
+        return _encode(to_encode)
+
+    if not use_cache:
+        return encode(texts)
+
+    cache = get_embedding_cache()
+    cached = cache.get_many(embedding_model_id(), texts)
+    missing = [i for i in range(len(texts)) if i not in cached]
+
+    if not missing:
+        return np.stack([cached[i] for i in range(len(texts))]) if texts else np.empty((0, 0), dtype=np.float32)
+
+    new_vectors = encode([texts[i] for i in missing])
+    cache.put_many(embedding_model_id(), [texts[i] for i in missing], new_vectors)
+
+    embeddings = np.empty((len(texts), new_vectors.shape[1]), dtype=np.float32)
+    embeddings[missing] = new_vectors
+    for i, vector in cached.items():
+        embeddings[i] = vector
     return embeddings
\ No newline at end of file
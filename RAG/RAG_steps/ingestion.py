@@ -0,0 +1,191 @@
+import hashlib
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from RAG.RAG_steps.embeddings import embed_texts
+from RAG.RAG_steps.dedup import Deduplicator
+from RAG.RAG_steps.patients import SHARED_PATIENT, patient_from_source
+
+
+def batched(iterable, batch_size):
+    """Yield lists of at most batch_size items from any iterable."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def chunk_identifier(source, text, occurrence=0):
+    """
+    Content-addressed id of a chunk: the same text of the same source always
+    gets the same id, and two sources never share one. `occurrence` tells
+    apart repeats of a text within one source.
+    """
+    digest = hashlib.sha256(f"{source}\0{occurrence}\0{text}".encode("utf-8")).hexdigest()
+    return f"{source}::{digest[:32]}"
+
+
+def with_identifiers(chunks):
+    """Set chunk['id'] on a stream of chunks."""
+    occurrences = Counter()
+    for chunk in chunks:
+        first_id = chunk_identifier(chunk['source'], chunk['text'])
+        occurrence = occurrences[first_id]
+        occurrences[first_id] += 1
+        chunk['id'] = first_id if occurrence == 0 else chunk_identifier(chunk['source'], chunk['text'], occurrence)
+        yield chunk
+
+
+def chunk_metadata(chunk):
+    """Metadata stored next to a chunk in the vector database."""
+    metadata = {
+        'source': chunk['source'],
+        'doc_id': chunk['doc_id'],
+        'chunk_id': chunk['chunk_id'],
+        'patient': patient_from_source(chunk['source']) or SHARED_PATIENT
+    }
+    if 'page' in chunk:
+        metadata['page'] = chunk['page']
+    if 'row_start' in chunk:
+        metadata['row_start'] = chunk['row_start']
+        metadata['row_end'] = chunk['row_end']
+    return metadata
+
+
+def ingest_chunks(chunks, collection, batch_size=64, deduplicate=False, embed_workers=1, progress=None,
+                  existing_ids=None, keyword_index=None):
+    """
+    Embed and store a stream of chunks in bounded batches.
+    Writes run in a background thread: batch N+1 is embedded while batch N
+    is upserted, and at most those two batches are alive at a time, so
+    memory stays flat whatever the size of the upload.
+    Args:
+        chunks: Iterable of chunk dictionaries (may be a generator)
+        collection: VectorStore (ChromaDB or NumPy)
+        batch_size: Number of chunks embedded and upserted together
+        deduplicate: Drop exact and near-duplicate chunks before embedding;
+                     the kept copy records every source in its metadata.
+                     Only chunks of the same patient are merged
+        embed_workers: Worker processes used to embed each batch
+        progress: Optional callback(stored, source) called after each write,
+                  with the chunks stored so far and the source of the last one
+        existing_ids: Ids already stored with the same settings; since ids
+                      are content-addressed these chunks are not embedded
+                      again, only their metadata is refreshed when their
+                      position in the file changed
+        keyword_index: Optional BM25Index updated with every written chunk
+                       and every metadata change
+    Returns: Dictionary with the number of 'chunks' stored, the number
+             'unchanged' (found in existing_ids) and the 'sources' they
+             came from, mapped to the ids of their chunks
+             (a duplicate's source maps to the id of the kept copy)
+    """
+    print("\n" + "=" * 25)
+    print("STEP 3-4: Embedding and storing chunks in batches")
+    print("=" * 25)
+    # Larger batches are rejected by the backend
+    if collection.max_batch_size and batch_size > collection.max_batch_size:
+        batch_size = collection.max_batch_size
+    print(f"Batch size: {batch_size} chunks")
+
+    stored = 0
+    unchanged = 0
+    sources = {}
+    reused = []
+    pending = None
+    existing_ids = existing_ids or set()
+
+    chunks = with_identifiers(chunks)
+    # Chunks of different patients are never merged: the kept copy's
+    # 'patient' metadata scopes the chatbot's searches
+    deduplicator = Deduplicator(partition=patient_from_source) if deduplicate else None
+    if deduplicator:
+        chunks = deduplicator.unique(chunks)
+
+    def changed(chunks):
+        nonlocal unchanged
+        for chunk in chunks:
+            if chunk['id'] in existing_ids:
+                unchanged += 1
+                sources.setdefault(chunk['source'], []).append(chunk['id'])
+                reused.append((chunk['id'], chunk_metadata(chunk)))
+            else:
+                yield chunk
+
+    def wait_for_write():
+        nonlocal stored
+        # Re-raises a failed write here, in the caller's thread
+        written, source = pending[0].result(), pending[1]
+        stored += written
+        print(f"  - Stored {stored} chunks so far")
+        if progress:
+            progress(stored, source)
+
+    def write(ids_list, vectors_list, text_list, metadata_list):
+        collection.upsert(
+            ids=ids_list,
+            embeddings=vectors_list,
+            documents=text_list,
+            metadatas=metadata_list
+        )
+        if keyword_index is not None:
+            keyword_index.add(ids_list, text_list, metadata_list)
+        return len(ids_list)
+
+    def update(ids_list, metadata_list):
+        collection.update(ids=ids_list, metadatas=metadata_list)
+        # Keyword-only hits and where filters read the index's own copy
+        if keyword_index is not None:
+            keyword_index.update(ids_list, metadata_list)
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="vector-store-writer") as writer:
+        for batch in batched(changed(chunks), batch_size):
+            ids_list = [chunk['id'] for chunk in batch]
+            text_list = [chunk['text'] for chunk in batch]
+            metadata_list = [chunk_metadata(chunk) for chunk in batch]
+
+            vectors_list = embed_texts(text_list, workers=embed_workers)
+
+            if pending:
+                wait_for_write()
+            pending = (writer.submit(write, ids_list, vectors_list, text_list, metadata_list), batch[-1]['source'])
+
+            for chunk, chunk_id in zip(batch, ids_list):
+                sources.setdefault(chunk['source'], []).append(chunk_id)
+
+        if pending:
+            wait_for_write()
+
+    merged = {}
+    if deduplicator:
+        # Kept chunks may have been written before their duplicates showed
+        # up, so their merged sources are recorded once the stream is done
+        for kept, kept_sources in deduplicator.merged_sources():
+            metadata = chunk_metadata(kept)
+            metadata['sources'] = "|".join(kept_sources)
+            merged[kept['id']] = metadata
+            for source in kept_sources[1:]:
+                sources.setdefault(source, []).append(kept['id'])
+        print(f"Duplicates skipped: {deduplicator.exact_duplicates} exact, {deduplicator.near_duplicates} near")
+
+    # The same text keeps its id when an edit moves it to another page or
+    # position: rewrite the metadata of the reused chunks that moved
+    refreshed = 0
+    for batch in batched(reused, batch_size):
+        batch = [(chunk_id, merged.pop(chunk_id, metadata)) for chunk_id, metadata in batch]
+        stored_metadatas = collection.get(ids=[chunk_id for chunk_id, _ in batch])
+        previous = dict(zip(stored_metadatas['ids'], stored_metadatas['metadatas']))
+        moved = [(chunk_id, metadata) for chunk_id, metadata in batch if previous.get(chunk_id) != metadata]
+        if moved:
+            update([chunk_id for chunk_id, _ in moved], [metadata for _, metadata in moved])
+            refreshed += len(moved)
+    if refreshed:
+        print(f"Metadata refreshed for {refreshed} moved chunks")
+
+    for batch in batched(merged.items(), batch_size):
+        update([chunk_id for chunk_id, _ in batch], [metadata for _, metadata in batch])
+
+    print(f"\nTotal chunks stored: {stored} ({unchanged} unchanged chunks skipped)")
+    return {'chunks': stored, 'unchanged': unchanged, 'sources': sources}
@@ -1,16 +1,426 @@
 # modified_document_loader.py
 import os
+import io
 import json
 import csv
-from docx import Document
-from PyPDF2 import PdfReader
-import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from importlib import metadata
+from RAG.RAG_steps.text_cache import file_key, get_cached_pages, store_pages
 
-def load_documents_from_folder(folder_path):
+# PDFs with more pages than this are split into page ranges so that
+# one big report does not keep a single worker busy on its own.
+PAGES_PER_TASK = 25
+
+# Extension -> function(data: bytes) -> text
+# Handlers import their heavy library (PyPDF2, python-docx, pandas) on first
+# use, so importing this module stays cheap when only text files are loaded.
+_FORMAT_HANDLERS = {}
+
+
+def register_format(*extensions):
+    """Decorator registering a handler that turns the raw bytes of a file into text."""
+    def decorator(handler):
+        for ext in extensions:
+            _FORMAT_HANDLERS[ext] = handler
+        return handler
+    return decorator
+
+
+def supported_extensions():
+    return set(_FORMAT_HANDLERS)
+
+
+# ----- TXT / Markdown -----
+@register_format(".txt", ".md")
+def _load_text(data):
+    return data.decode("utf-8")
+
+
+# ----- DOCX -----
+@register_format(".docx")
+def _load_docx(data):
+    from docx import Document
+
+    doc = Document(io.BytesIO(data))
+    return "\n".join([para.text for para in doc.paragraphs])
+
+
+# ----- PDF -----
+def _pdf_reader(source):
+    """PDF reader over raw bytes or a file path (read on demand, not loaded whole)."""
+    from PyPDF2 import PdfReader
+
+    return PdfReader(io.BytesIO(source) if isinstance(source, bytes) else source)
+
+
+def _iter_pdf_pages(data):
+    """Yield the text of each page of a PDF."""
+    for page in _pdf_reader(data).pages:
+        yield page.extract_text() or ""
+
+
+@register_format(".pdf")
+def _load_pdf(data):
+    return "\n".join(_iter_pdf_pages(data))
+
+
+# ----- CSV -----
+@register_format(".csv")
+def _load_csv(data):
+    reader = csv.reader(data.decode("utf-8").splitlines())
+    rows = []
+    header = next(reader, None)
+    for row in reader:
+        if header:
+            rows.append(dict(zip(header, row)))
+        else:
+            rows.append(row)
+    return json.dumps(rows, indent=2, ensure_ascii=False)
+
+
+# ----- JSON -----
+@register_format(".json")
+def _load_json(data):
+    return json.dumps(json.loads(data.decode("utf-8")), indent=2, ensure_ascii=False)
+
+
+# ----- XLSX -----
+@register_format(".xlsx")
+def _load_xlsx(data):
+    import pandas as pd
+
+    df = pd.read_excel(io.BytesIO(data))
+    return df.to_json(orient="records", indent=2, force_ascii=False)
+
+
+# Formats whose extracted text is cached on disk, since parsing them is the
+# slowest step of ingestion: extension -> (library, extraction revision).
+# Bump the revision when the extraction code of that format changes.
+_CACHED_FORMATS = {
+    ".pdf": ("PyPDF2", 1),
+    ".docx": ("python-docx", 1),
+}
+
+
+def _extractor_version(ext):
+    library, revision = _CACHED_FORMATS[ext]
+    try:
+        library_version = metadata.version(library)
+    except metadata.PackageNotFoundError:
+        library_version = "unknown"
+    return f"{ext}/{revision}/{library}-{library_version}"
+
+
+def _extract_pages(data, ext):
+    """Uncached extraction as a list of page texts (a single entry for non-PDF formats)."""
+    if ext == ".pdf":
+        return list(_iter_pdf_pages(data))
+    return [_FORMAT_HANDLERS[ext](data)]
+
+
+# Extension -> function(data: bytes) -> iterator of records (dicts, or lists
+# when a CSV has no header). Used in tabular mode, where rows are streamed
+# and packed whole into chunks instead of being dumped as one JSON string.
+_TABLE_HANDLERS = {}
+
+
+def register_table_format(*extensions):
+    """Decorator registering a handler that streams the records of a tabular file."""
+    def decorator(handler):
+        for ext in extensions:
+            _TABLE_HANDLERS[ext] = handler
+        return handler
+    return decorator
+
+
+@register_table_format(".csv")
+def _iter_csv_records(data):
+    reader = csv.reader(io.TextIOWrapper(io.BytesIO(data), encoding="utf-8", newline=""))
+    header = next(reader, None)
+    for row in reader:
+        yield dict(zip(header, row)) if header else row
+
+
+@register_table_format(".xlsx")
+def _iter_xlsx_records(data):
+    from openpyxl import load_workbook
+
+    # read_only mode streams rows from the sheet XML instead of building the
+    # whole workbook; first sheet only, like pandas.read_excel
+    workbook = load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        for row in rows:
+            if all(value is None for value in row):
+                continue
+            yield {str(key): value for key, value in zip(header, row) if key is not None}
+    finally:
+        workbook.close()
+
+
+@register_table_format(".json")
+def _iter_json_records(data):
+    parsed = json.loads(data.decode("utf-8"))
+    if isinstance(parsed, list):
+        yield from parsed
+    elif isinstance(parsed, dict):
+        # A single object (e.g. one report): one record per top-level field
+        for key, value in parsed.items():
+            yield {key: value}
+    else:
+        yield parsed
+
+
+def _read_bytes(source):
+    """Sources are raw bytes (uploads) or a file path (folder); handlers only see bytes."""
+    if isinstance(source, bytes):
+        return source
+    with open(source, "rb") as f:
+        return f.read()
+
+
+def extract_content(source, ext):
+    """
+    Extract the text of a file with the handler registered for its extension.
+    Args:
+        source: Raw bytes of the file, or its path
+        ext: Lower-case extension including the dot (e.g. '.pdf')
+    Returns: Text content, or None when the extension is not supported
+    """
+    handler = _FORMAT_HANDLERS.get(ext)
+    if handler is None:
+        return None
+
+    data = _read_bytes(source)
+    if ext not in _CACHED_FORMATS:
+        return handler(data)
+
+    version = _extractor_version(ext)
+    pages = get_cached_pages(data, version)
+    if pages is None:
+        pages = _extract_pages(data, ext)
+        store_pages(data, version, pages)
+    return "\n".join(pages)
+
+
+def _extract_pdf_pages(source, start, end):
+    """Process-pool task: extract the text of pages [start, end) of a PDF."""
+    reader = _pdf_reader(source)
+    return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+def _extract_source_pages(source, ext):
+    """Process-pool task: uncached extraction of a file given by path or bytes."""
+    return _extract_pages(_read_bytes(source), ext)
+
+
+def _extract_in_parallel(files, max_workers=None, pages_per_task=PAGES_PER_TASK):
+    """
+    Extract many files with a process pool.
+    Args:
+        files: List of (name, ext, source) tuples, source being a path or bytes
+        max_workers: Number of worker processes (None = one per CPU core)
+        pages_per_task: Page range size used to split large PDFs
+    Returns: List of extracted contents (or the raised exception) in the
+             same order as `files`
+    """
+    results = []
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        # Submit everything first so all workers are busy, keeping the
+        # futures of each file together so the output order stays fixed.
+        pending = []
+        for name, ext, source in files:
+            try:
+                if ext not in _CACHED_FORMATS:
+                    pending.append(("content", executor.submit(extract_content, source, ext)))
+                    continue
+
+                # The extracted text cache is only read and written here, in
+                # the parent; workers always parse. The parent keeps only the
+                # hash: workers get the path, as in the uncached case, so file
+                # bytes are not pickled into every task nor held until the end.
+                key = file_key(source)
+                version = _extractor_version(ext)
+                pages = get_cached_pages(key, version)
+                if pages is not None:
+                    pending.append(("cached", pages))
+                    continue
+
+                if ext == ".pdf":
+                    page_count = len(_pdf_reader(source).pages)
+                    futures = [
+                        executor.submit(_extract_pdf_pages, source, start,
+                                        min(start + pages_per_task, page_count))
+                        for start in range(0, page_count, pages_per_task)
+                    ]
+                else:
+                    futures = [executor.submit(_extract_source_pages, source, ext)]
+                pending.append(("pages", (futures, key, version)))
+            except Exception as e:
+                pending.append(("error", e))
+
+        for kind, value in pending:
+            try:
+                if kind == "content":
+                    results.append(value.result())
+                elif kind == "cached":
+                    results.append("\n".join(value))
+                elif kind == "pages":
+                    futures, key, version = value
+                    pages = []
+                    for future in futures:
+                        pages.extend(future.result())
+                    store_pages(key, version, pages)
+                    results.append("\n".join(pages))
+                else:
+                    results.append(value)
+            except Exception as e:
+                results.append(e)
+
+    return results
+
+
+def _iter_documents(files, split_pages=False, tabular=False):
+    """
+    Lazily extract `files` one at a time.
+    Args:
+        files: Iterable of (name, ext, source) tuples
+        split_pages: Yield one segment per PDF page instead of the whole PDF
+        tabular: Yield CSV/XLSX/JSON files as a lazy iterator of 'records'
+                 instead of one JSON dump in 'content'
+    Yields: Document dictionaries (PDF page segments also carry 'page')
+    """
+    count = 0
+    for name, ext, source in files:
+        try:
+            if tabular and ext in _TABLE_HANDLERS:
+                print(f"Loaded: {name}")
+                print(f"  - Type: {ext}")
+                print("  - Rows: streamed")
+                count += 1
+                yield {
+                    "content": "",
+                    "records": _TABLE_HANDLERS[ext](_read_bytes(source)),
+                    "source": name,
+                    "length": 0,
+                    "file_type": ext.replace('.', '')
+                }
+                continue
+
+            if split_pages and ext == ".pdf":
+                data = _read_bytes(source)
+                version = _extractor_version(ext)
+                cached_pages = get_cached_pages(data, version)
+                # On a miss, pages are still yielded as they are parsed and
+                # only collected for the cache
+                extracted = [] if cached_pages is None else None
+                page_texts = _iter_pdf_pages(data) if cached_pages is None else cached_pages
+
+                pages = 0
+                for page_number, text in enumerate(page_texts, start=1):
+                    pages += 1
+                    if extracted is not None:
+                        extracted.append(text)
+                    yield {
+                        "content": text,
+                        "source": name,
+                        "length": len(text),
+                        "file_type": "pdf",
+                        "page": page_number
+                    }
+                print(f"Loaded: {name}")
+                print(f"  - Type: {ext}")
+                print(f"  - Pages streamed: {pages}{' (cached)' if cached_pages is not None else ''}")
+                if extracted is not None:
+                    store_pages(data, version, extracted)
+                count += 1
+                continue
+
+            content = extract_content(source, ext)
+        except Exception as e:
+            print(f"Error loading {name}: {e}")
+            continue
+
+        if content is None:
+            print(f"Skipping unsupported file type: {name}")
+            continue
+
+        count += 1
+        yield _build_document(name, ext, content)
+
+    print(f"\nTotal documents streamed: {count}")
+
+
+def _build_document(name, ext, content):
+    print(f"Loaded: {name}")
+    print(f"  - Type: {ext}")
+    print(f"  - Characters: {len(content)}")
+    print(f"  - Words: {len(content.split())}")
+
+    return {
+        "content": content,
+        "source": name,
+        "length": len(content),
+        "file_type": ext.replace('.', '')
+    }
+
+
+def _load_documents(files, parallel=False, max_workers=None):
+    """Extract a list of (name, ext, source) files, sequentially or in a process pool."""
+    if parallel:
+        print(f"Extracting {len(files)} files in parallel (workers: {max_workers or os.cpu_count()})")
+        contents = _extract_in_parallel(files, max_workers)
+    else:
+        contents = []
+        for _, ext, source in files:
+            try:
+                contents.append(extract_content(source, ext))
+            except Exception as e:
+                contents.append(e)
+
+    documents = []
+    for (name, ext, _), content in zip(files, contents):
+        if isinstance(content, Exception):
+            print(f"Error loading {name}: {content}")
+            continue
+        if content is None:
+            print(f"Skipping unsupported file type: {name}")
+            continue
+
+        # Append document info
+        documents.append(_build_document(name, ext, content))
+
+    print(f"\nTotal documents loaded: {len(documents)}")
+    return documents
+
+
+def _folder_files(folder_path):
+    """(path, ext, path) for every supported file of a folder."""
+    supported_exts = supported_extensions()
+    for f in os.listdir(folder_path):
+        ext = os.path.splitext(f)[1].lower()
+        if ext in supported_exts:
+            path = os.path.join(folder_path, f)
+            yield (path, ext, path)
+
+
+def _uploaded_files(uploaded_files):
+    """(name, ext, bytes) for every Streamlit uploaded file."""
+    for uploaded_file in uploaded_files:
+        yield (uploaded_file.name, os.path.splitext(uploaded_file.name)[1].lower(), uploaded_file.getvalue())
+
+
+def load_documents_from_folder(folder_path, parallel=False, max_workers=None):
     """
     Load all supported documents (TXT, DOCX, PDF, CSV, JSON, XLSX, MD)
     from a given folder.
     Args: folder_path (str): Path to the folder containing documents.
+          parallel (bool): Extract files (and page ranges of large PDFs)
+                           in a process pool instead of one at a time.
+          max_workers (int): Number of worker processes when parallel
+                             (None = one per CPU core).
     Returns: list: List of dictionaries with keys:
               'content', 'source', 'length', and 'file_type'
     """
@@ -18,99 +428,21 @@ def load_documents_from_folder(folder_path):
     print("STEP 1: Loading documents from a folder")
     print("=" * 60)
 
-    supported_exts = {".txt", ".docx", ".pdf", ".csv", ".json", ".xlsx", ".md"}
-    documents = []
-
     if not os.path.isdir(folder_path):
         print(f"Error: {folder_path} is not a valid directory.")
-        return documents
+        return []
 
-    file_paths = [
-        os.path.join(folder_path, f)
-        for f in os.listdir(folder_path)
-        if os.path.splitext(f)[1].lower() in supported_exts
-    ]
+    files = list(_folder_files(folder_path))
 
-    if not file_paths:
+    if not files:
         print("No supported files found in the folder.")
-        return documents
-
-    for file_path in file_paths:
-        ext = os.path.splitext(file_path)[1].lower()
-        content = ""
-
-        try:
-            # ----- TXT -----
-            if ext == ".txt":
-                with open(file_path, "r", encoding="utf-8") as f:
-                    content = f.read()
-
-            # ----- DOCX -----
-            elif ext == ".docx":
-                doc = Document(file_path)
-                content = "\n".join([para.text for para in doc.paragraphs])
-
-            # ----- PDF -----
-            elif ext == ".pdf":
-                reader = PdfReader(file_path)
-                pages = [page.extract_text() or "" for page in reader.pages]
-                content = "\n".join(pages)
-
-            # ----- CSV -----
-            elif ext == ".csv":
-                rows = []
-                with open(file_path, "r", encoding="utf-8") as f:
-                    reader = csv.reader(f)
-                    header = next(reader, None)
-                    for row in reader:
-                        if header:
-                            rows.append(dict(zip(header, row)))
-                        else:
-                            rows.append(row)
-                content = json.dumps(rows, indent=2, ensure_ascii=False)
-
-            # ----- JSON -----
-            elif ext == ".json":
-                with open(file_path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                content = json.dumps(data, indent=2, ensure_ascii=False)
-
-            # ----- XLSX -----
-            elif ext == ".xlsx":
-                df = pd.read_excel(file_path)
-                content = df.to_json(orient="records", indent=2, force_ascii=False)
-
-            # ----- Markdown -----
-            elif ext == ".md":
-                with open(file_path, "r", encoding="utf-8") as f:
-                    content = f.read()
-
-            else:
-                print(f"Skipping unsupported file type: {file_path}")
-                continue
-
-            # Append document info
-            documents.append({
-                "content": content,
-                "source": file_path,
-                "length": len(content),
-                "file_type": ext.replace('.', '')
-            })
+        return []
 
-            print(f"Loaded: {file_path}")
-            print(f"  - Type: {ext}")
-            print(f"  - Characters: {len(content)}")
-            print(f"  - Words: {len(content.split())}")
-
-        except Exception as e:
-            print(f"Error loading {file_path}: {e}")
-
-    print(f"\nTotal documents loaded: {len(documents)}")
-    return documents
+    return _load_documents(files, parallel, max_workers)
 
 
 
-def load_documents_from_streamlit_files(uploaded_files):
+def load_documents_from_streamlit_files(uploaded_files, parallel=False, max_workers=None):
     """
     Modified version of the above function that works directly with Streamlit uploaded files without needing to pass the path of folder
     Load all supported documents directly from Streamlit uploaded files
@@ -119,93 +451,45 @@ def load_documents_from_streamlit_files(uploaded_files):
     print("STEP 1: Loading documents from Streamlit uploaded files")
     print("=" * 60)
 
-    documents = []
-
     if not uploaded_files:
         print("No files provided.")
-        return documents
+        return []
 
-    for uploaded_file in uploaded_files:
-        file_name = uploaded_file.name
-        ext = os.path.splitext(file_name)[1].lower()
-        content = ""
+    # Uploaded files are read as bytes so they can be sent to worker processes
+    return _load_documents(list(_uploaded_files(uploaded_files)), parallel, max_workers)
 
-        try:
-            # ----- TXT -----
-            if ext == ".txt":
-                content = uploaded_file.getvalue().decode("utf-8")
-
-            # ----- DOCX -----
-            elif ext == ".docx":
-                # Reset file pointer to beginning
-                uploaded_file.seek(0)
-                doc = Document(uploaded_file)
-                content = "\n".join([para.text for para in doc.paragraphs])
-
-            # ----- PDF -----
-            elif ext == ".pdf":
-                # Reset file pointer to beginning
-                uploaded_file.seek(0)
-                reader = PdfReader(uploaded_file)
-                pages = [page.extract_text() or "" for page in reader.pages]
-                content = "\n".join(pages)
-
-            # ----- CSV -----
-            elif ext == ".csv":
-                # Reset file pointer to beginning
-                uploaded_file.seek(0)
-                text_content = uploaded_file.getvalue().decode("utf-8")
-                reader = csv.reader(text_content.splitlines())
-                rows = []
-                header = next(reader, None)
-                for row in reader:
-                    if header:
-                        rows.append(dict(zip(header, row)))
-                    else:
-                        rows.append(row)
-                content = json.dumps(rows, indent=2, ensure_ascii=False)
-
-            # ----- JSON -----
-            elif ext == ".json":
-                # Reset file pointer to beginning
-                uploaded_file.seek(0)
-                data = json.load(uploaded_file)
-                content = json.dumps(data, indent=2, ensure_ascii=False)
-
-            # ----- XLSX -----
-            elif ext == ".xlsx":
-                # Reset file pointer to beginning
-                uploaded_file.seek(0)
-                df = pd.read_excel(uploaded_file)
-                content = df.to_json(orient="records", indent=2, force_ascii=False)
-
-            # ----- Markdown -----
-            elif ext == ".md":
-                content = uploaded_file.getvalue().decode("utf-8")
-
-            else:
-                print(f"Skipping unsupported file type: {file_name}")
-                continue
-
-            # Append document info
-            documents.append({
-                "content": content,
-                "source": file_name,
-                "length": len(content),
-                "file_type": ext.replace('.', '')
-            })
 
-            print(f"Loaded: {file_name}")
-            print(f"  - Type: {ext}")
-            print(f"  - Characters: {len(content)}")
-            print(f"  - Words: {len(content.split())}")
+def iter_documents_from_folder(folder_path, split_pages=False, tabular=False):
+    """
+    Streaming version of load_documents_from_folder.
+    Documents are extracted one at a time and yielded, so only the current
+    document (or PDF page when split_pages=True) is held in memory.
+    With tabular=True, CSV/XLSX/JSON files carry a lazy 'records' iterator.
+    """
+    print("=" * 60)
+    print("STEP 1: Streaming documents from a folder")
+    print("=" * 60)
 
-        except Exception as e:
-            print(f"Error loading {file_name}: {e}")
+    if not os.path.isdir(folder_path):
+        print(f"Error: {folder_path} is not a valid directory.")
+        return
 
-    print(f"\nTotal documents loaded: {len(documents)}")
-    return documents
+    yield from _iter_documents(_folder_files(folder_path), split_pages, tabular)
 
 
+def iter_documents_from_streamlit_files(uploaded_files, split_pages=False, tabular=False):
+    """
+    Streaming version of load_documents_from_streamlit_files.
+    Documents are extracted one at a time and yielded, so only the current
+    document (or PDF page when split_pages=True) is held in memory.
+    With tabular=True, CSV/XLSX/JSON files carry a lazy 'records' iterator.
+    """
+    print("=" * 60)
+    print("STEP 1: Streaming documents from Streamlit uploaded files")
+    print("=" * 60)
 
+    if not uploaded_files:
+        print("No files provided.")
+        return
 
+    yield from _iter_documents(_uploaded_files(uploaded_files), split_pages, tabular)
@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+
+# Kept next to the Chroma files so that wiping the database also wipes
+# the record of what was ingested into it.
+MANIFEST_PATH = "./chroma_persist/ingest_manifest.json"
+# Bump when chunking or chunk metadata changes, so files are re-ingested to get it
+METADATA_VERSION = 5
+
+
+def content_hash(data):
+    """SHA-256 of the raw bytes of a file."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def ingestion_settings(chunk_size, overlap, model_name, tabular=False, chunking="characters", deduplicate=False):
+    """Settings that change the stored chunks: a file must be re-ingested when one of them changes."""
+    return {
+        'chunk_size': chunk_size,
+        'overlap': overlap,
+        'model_name': model_name,
+        'tabular': tabular,
+        'chunking': chunking,
+        'deduplicate': deduplicate,
+        'metadata_version': METADATA_VERSION
+    }
+
+
+def load_manifest(path=MANIFEST_PATH):
+    """
+    Load the ingestion manifest.
+    Returns: Dictionary source -> {'hash', 'settings', 'chunk_ids'}
+    """
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Could not read ingestion manifest {path}: {e}")
+        return {}
+
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    """Write the manifest atomically so a crash never leaves it half written."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def is_unchanged(manifest, source, file_hash, settings, collection):
+    """
+    True when `source` was already ingested with the same content and settings
+    and its chunks are still in the collection.
+    """
+    entry = manifest.get(source)
+    if not entry or entry['hash'] != file_hash or entry['settings'] != settings:
+        return False
+
+    # The collection may have been reset behind the manifest's back
+    if entry['chunk_ids'] and not collection.get(ids=entry['chunk_ids'][:1])['ids']:
+        return False
+    return True
+
+
+def reusable_ids(manifest, sources, settings, collection):
+    """
+    Ids of the chunks already stored for `sources` with the same settings.
+    Chunk ids are content-addressed, so a re-ingested file only needs to
+    embed and write the chunks whose id is not in this set.
+    """
+    candidates = []
+    for source in sources:
+        entry = manifest.get(source)
+        if entry and entry['settings'] == settings:
+            candidates.extend(entry['chunk_ids'])
+    if not candidates:
+        return set()
+
+    # The collection may have been reset behind the manifest's back
+    return set(collection.get(ids=candidates)['ids'])
+
+
+def forget_file(manifest, source, collection, keep=(), keyword_index=None):
+    """
+    Remove the chunks previously stored for `source` and drop its manifest entry.
+    Chunks in `keep` (still produced by the new version of the file) and
+    chunks referenced by another file (deduplicated boilerplate) are kept.
+    The removed chunks are also dropped from `keyword_index` when given.
+    Returns: List of the removed chunk ids
+    """
+    entry = manifest.pop(source, None)
+    if not entry or not entry['chunk_ids']:
+        return []
+
+    referenced = set(keep)
+    for other in manifest.values():
+        referenced.update(other['chunk_ids'])
+    stale_ids = [chunk_id for chunk_id in entry['chunk_ids'] if chunk_id not in referenced]
+
+    if stale_ids:
+        collection.delete(ids=stale_ids)
+        if keyword_index is not None:
+            keyword_index.remove(stale_ids)
+        print(f"Removed {len(stale_ids)} old chunks of {source}")
+    return stale_ids
+
+
+def record_file(manifest, source, file_hash, settings, chunk_ids):
+    manifest[source] = {
+        'hash': file_hash,
+        'settings': settings,
+        'chunk_ids': chunk_ids
+    }
@@ -0,0 +1,50 @@
+import os
+import re
+from Schema.Data import CLIENTS
+
+# "Ali_report.pdf", "sara-report.docx", "Fatima report 2025.txt"
+_REPORT_NAME = re.compile(r"^([A-Za-z]+)[\s_-]+report\b", re.IGNORECASE)
+# 'patient' metadata of chunks from files about several patients or none
+# (lab_results.xlsx, policies): every patient-scoped search includes them
+SHARED_PATIENT = "shared"
+
+
+def known_patients():
+    return [client['name'] for client in CLIENTS]
+
+
+def patient_from_source(source, patients=None):
+    """
+    Patient a file belongs to, from its name: a known client name at the
+    start of the file name, or "<Name>_report". None for shared documents.
+    """
+    patients = known_patients() if patients is None else patients
+    stem = os.path.splitext(os.path.basename(source))[0]
+    first_word = re.split(r"[\s_-]+", stem, maxsplit=1)[0].lower()
+
+    for patient in patients:
+        if patient.lower() == first_word:
+            return patient
+
+    match = _REPORT_NAME.match(stem)
+    return match.group(1).capitalize() if match else None
+
+
+def patient_filter(patient):
+    """Metadata filter restricting a search to `patient` and the shared documents."""
+    return {'patient': {'$in': [patient, SHARED_PATIENT]}}
+
+
+def detect_patient(question, patients=None):
+    """
+    Patient a chatbot question is about, or None when it names no patient
+    or several of them (the search is then not scoped).
+    Names right after "Dr." / "doctor" are doctors, not patients.
+    """
+    patients = known_patients() if patients is None else patients
+    found = set()
+    for patient in patients:
+        pattern = r"(?<!dr\. )(?<!dr )(?<!doctor )\b" + re.escape(patient) + r"\b"
+        if re.search(pattern, question, re.IGNORECASE):
+            found.add(patient)
+    return found.pop() if len(found) == 1 else None
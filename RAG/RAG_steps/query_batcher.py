@@ -0,0 +1,88 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from RAG.RAG_steps.embeddings import embed_texts
+
+# A request waits at most MAX_WAIT_MS for others to join its batch
+MAX_WAIT_MS = 5
+MAX_BATCH_SIZE = 32
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+class QueryBatcher:
+    """
+    Micro-batches single-query embedding requests.
+    Every Streamlit session runs in its own thread of the same process;
+    their questions are queued, collected for up to max_wait_ms (or until
+    max_batch_size are waiting) and encoded with one call. Each caller
+    blocks on its own future until its vector is ready.
+    """
+
+    def __init__(self, encode=embed_texts, max_wait_ms=MAX_WAIT_MS, max_batch_size=MAX_BATCH_SIZE):
+        self.encode = encode
+        self.max_wait = max_wait_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.requests = 0
+        self.batches = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="query-batcher", daemon=True)
+        self._thread.start()
+
+    def embed(self, text):
+        """Embed one query. Returns its vector (blocks until its batch is encoded)."""
+        future = Future()
+        self._queue.put((text, future))
+        return future.result()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                vectors = self.encode([text for text, _ in batch])
+                for (_, future), vector in zip(batch, vectors):
+                    future.set_result(vector)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+
+            self.requests += len(batch)
+            self.batches += 1
+
+    def stats(self):
+        average = self.requests / self.batches if self.batches else 0.0
+        return {
+            'requests': self.requests,
+            'batches': self.batches,
+            'avg_batch_size': average,
+            'fill_rate': average / self.max_batch_size
+        }
+
+
+def get_query_batcher():
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = QueryBatcher()
+    return _batcher
+
+
+def embed_query(text):
+    """Embed a single chatbot question through the shared micro-batcher."""
+    return get_query_batcher().embed(text)
@@ -0,0 +1,76 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+import numpy as np
+
+MAX_CACHE_ENTRIES = 1024
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+class RetrievalCache:
+    """
+    In-memory LRU cache of retrieval results.
+    Keys combine the hash of the query embedding, top_k, the metadata
+    filter, the hybrid query text and the version counters of the vector
+    store and keyword index. Every upsert, update or delete bumps a version,
+    so results cached before a write are never returned after it.
+    """
+
+    def __init__(self, max_entries=MAX_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(query_embedding, top_k, collection, where=None, query_text=None, keyword_index=None):
+        vector = np.ascontiguousarray(query_embedding, dtype=np.float32)
+        parts = [
+            hashlib.sha256(vector.tobytes()).hexdigest(),
+            str(top_k),
+            json.dumps(where, sort_keys=True),
+            query_text if keyword_index is not None and query_text else "",
+            str(collection.version),
+            str(keyword_index.version) if keyword_index is not None else ""
+        ]
+        return "\0".join(parts)
+
+    def get(self, key):
+        with self._lock:
+            results = self._entries.get(key)
+            if results is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return results
+
+    def put(self, key, results):
+        with self._lock:
+            self._entries[key] = results
+            self._entries.move_to_end(key)
+            # Entries of older versions are never hit again and age out here
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self._entries)
+        }
+
+
+def get_retrieval_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = RetrievalCache()
+    return _cache
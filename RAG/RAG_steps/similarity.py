@@ -1,22 +1,149 @@
-def retrieve_relevant_chunks(query_embedding, collection, top_k=3):
+# Rank constant of reciprocal rank fusion (the usual value from the RRF paper)
+RRF_K = 60
+# Hybrid mode fuses this many candidates per ranking (at least top_k)
+HYBRID_CANDIDATES = 20
+
+
+def distance_to_similarity(distance, space="l2"):
+    """
+    Cosine similarity from a distance returned by the vector store.
+    "cosine" and "ip" distances are 1 - similarity. "l2" distances are
+    squared, and for the unit-length vectors of our embedding model
+    |a - b|^2 = 2 - 2 cos(a, b).
+    """
+    if space == "l2":
+        return 1 - distance / 2
+    return 1 - distance
+
+
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    """
+    Fuse rankings (lists of ids, best first): an id scores the sum of
+    1 / (k + rank) over the rankings it appears in.
+    Returns: List of (id, score), best first
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking, start=1):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def _fuse(vector_results, keyword_hits, collection, top_k):
+    """
+    Merge vector results and BM25 hits (one list per query) into the query
+    result format. Keyword-only hits of all queries are fetched with one get().
+    """
+    found = {}
+    fused_rankings = []
+    for i, hits in enumerate(keyword_hits):
+        for chunk_id, doc, distance, metadata in zip(
+            vector_results['ids'][i],
+            vector_results['documents'][i],
+            vector_results['distances'][i],
+            vector_results['metadatas'][i]
+        ):
+            # The same chunk has a different distance to each query
+            found[(i, chunk_id)] = (doc, distance, metadata)
+        fused_rankings.append(
+            reciprocal_rank_fusion([vector_results['ids'][i], [chunk_id for chunk_id, _ in hits]])[:top_k])
+
+    # Keyword-only hits were not returned by the vector search
+    missing = {chunk_id for i, fused in enumerate(fused_rankings) for chunk_id, _ in fused
+               if (i, chunk_id) not in found}
+    fetched = {}
+    if missing:
+        response = collection.get(ids=list(missing))
+        for chunk_id, doc, metadata in zip(response['ids'], response['documents'], response['metadatas']):
+            fetched[chunk_id] = (doc, None, metadata)
+
+    results = {'ids': [], 'documents': [], 'distances': [], 'metadatas': [], 'scores': []}
+    for i, fused in enumerate(fused_rankings):
+        fused = [(chunk_id, score, found.get((i, chunk_id)) or fetched.get(chunk_id)) for chunk_id, score in fused]
+        fused = [item for item in fused if item[2] is not None]
+        results['ids'].append([chunk_id for chunk_id, _, _ in fused])
+        results['documents'].append([hit[0] for _, _, hit in fused])
+        results['distances'].append([hit[1] for _, _, hit in fused])
+        results['metadatas'].append([hit[2] for _, _, hit in fused])
+        results['scores'].append([score for _, score, _ in fused])
+    return results
+
+
+def _search(query_embeddings, collection, top_k, where, query_texts, keyword_index):
+    """One vectorized query for all embeddings, fused with BM25 when query_texts are given."""
+    hybrid = keyword_index is not None and query_texts is not None
+    results = collection.query(
+        query_embeddings=query_embeddings,
+        n_results=max(top_k, HYBRID_CANDIDATES) if hybrid else top_k,
+        where=where
+    )
+    if hybrid:
+        keyword_hits = [keyword_index.search(text, max(top_k, HYBRID_CANDIDATES), where) if text else []
+                        for text in query_texts]
+        results = _fuse(results, keyword_hits, collection, top_k)
+    return results
+
+
+def retrieve_batch(query_embeddings, collection, top_k=3, where=None, query_texts=None, keyword_index=None):
+    """
+    Retrieve the most relevant chunks for many queries at once, silently.
+    The whole matrix of query embeddings goes to the vector store in a
+    single query call; use this instead of looping over
+    retrieve_relevant_chunks for evaluations and batch re-answering.
+    Args:
+        query_embeddings: Matrix (or list) of query vectors
+        collection: VectorStore (ChromaDB or NumPy)
+        top_k: Number of results per query
+        where: Optional metadata filter shared by all queries
+        query_texts: Question texts, one per embedding; with keyword_index,
+                     enables hybrid mode
+        keyword_index: BM25Index fused with the vector ranking
+    Returns: List with one dictionary per query: 'ids', 'documents',
+             'metadatas', 'distances' (and 'scores' in hybrid mode)
+    """
+    if len(query_embeddings) == 0:
+        return []
+    results = _search(query_embeddings, collection, top_k, where, query_texts, keyword_index)
+    keys = [key for key in ('ids', 'documents', 'metadatas', 'distances', 'scores') if results.get(key) is not None]
+    return [{key: results[key][i] for key in keys} for i in range(len(results['ids']))]
+
+
+def retrieve_relevant_chunks(query_embedding, collection, top_k=3, where=None, query_text=None, keyword_index=None,
+                             cache=None):
     """
     Search vector database for most relevant chunks.
     Args:
         query_embedding: Query vector
-        collection: ChromaDB collection
+        collection: VectorStore (ChromaDB or NumPy)
         top_k: Number of results to return
+        where: Optional metadata filter applied before the vector search,
+               e.g. {'patient': 'Sara'}
+        query_text: Question text; with keyword_index, enables hybrid mode
+        keyword_index: BM25Index; its ranking for query_text is fused with
+                       the vector ranking by reciprocal rank fusion
+        cache: Optional RetrievalCache; results are reused until the
+               collection or keyword index changes
     Returns: Dictionary with retrieved documents, distances, and metadata
+             (hybrid mode adds fused 'scores'; keyword-only hits have no distance)
     """
+    hybrid = keyword_index is not None and bool(query_text)
     print("\n" + "=" * 25)
     print("STEP 6: Retrieve Relevant Chunks")
     print("=" * 25)
-    print(f"Searching for top {top_k} most relevant chunks...")
+    print(f"Searching for top {top_k} most relevant chunks..." + (f" (filter: {where})" if where else "")
+          + (" [hybrid BM25 + vector]" if hybrid else ""))
     
-    # Query the collection
-    results = collection.query(
-        query_embeddings=query_embedding,
-        n_results=top_k
-    )
+    # Query the collection, unless the same search was done since the last write
+    results = None
+    if cache is not None:
+        cache_key = cache.key(query_embedding, top_k, collection, where, query_text, keyword_index)
+        results = cache.get(cache_key)
+        if results is not None:
+            print("✓ Served from the retrieval cache")
+    if results is None:
+        results = _search(query_embedding, collection, top_k, where, [query_text] if hybrid else None, keyword_index)
+        if cache is not None:
+            cache.put(cache_key, results)
     
     print(f"✓ Retrieved {len(results['documents'][0])} chunks")
     print("\nRetrieved chunks (ranked by relevance):")
@@ -27,9 +154,11 @@ def retrieve_relevant_chunks(query_embedding, collection, top_k=3):
         results['distances'][0],
         results['metadatas'][0]
     )):
-        similarity = 1 - distance  # Convert distance to similarity
-        
-        print(f"\nChunk {i + 1} (Similarity: {similarity:.3f})")
+        if distance is None:
+            print(f"\nChunk {i + 1} (Keyword match)")
+        else:
+            similarity = distance_to_similarity(distance, collection.space)
+            print(f"\nChunk {i + 1} (Similarity: {similarity:.3f})")
         print(f"Source: {metadata['source']}")
         print(f"Preview: {doc[:150]}...")
         print("-" * 60)
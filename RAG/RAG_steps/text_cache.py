@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+
+# Extracted text of slow-to-parse files (PDF, DOCX), keyed by the hash of the
+# file bytes and the extractor version, so re-uploads and re-chunking
+# experiments skip parsing entirely.
+CACHE_DIR = "./cache/extracted_text"
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+CACHE_ENABLED = True
+
+
+def file_key(source):
+    """
+    Cache key of a file: SHA-256 of its raw bytes, or of the file at a path
+    (read in blocks, so the file is never held in memory).
+    """
+    if isinstance(source, bytes):
+        return hashlib.sha256(source).hexdigest()
+    digest = hashlib.sha256()
+    with open(source, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _cache_path(data, extractor_version, cache_dir):
+    key = data if isinstance(data, str) else file_key(data)
+    version = hashlib.sha256(extractor_version.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(cache_dir, f"{key}_{version}.json")
+
+
+def get_cached_pages(data, extractor_version, cache_dir=CACHE_DIR):
+    """
+    Look up the extracted text of a file.
+    Args:
+        data: Raw bytes of the file, or their file_key()
+        extractor_version: Identifies the extraction code and library version
+    Returns: List of page texts, or None on a cache miss
+    """
+    if not CACHE_ENABLED:
+        return None
+
+    path = _cache_path(data, extractor_version, cache_dir)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            pages = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    # The modification time is the "last used" time for LRU eviction
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return pages
+
+
+def store_pages(data, extractor_version, pages, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+    """
+    Save the extracted page texts of a file (`data`: raw bytes or their
+    file_key()), then evict old entries above max_bytes.
+    """
+    if not CACHE_ENABLED:
+        return
+
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _cache_path(data, extractor_version, cache_dir)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(pages, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Could not write extracted text cache {path}: {e}")
+        return
+
+    evict(cache_dir, max_bytes)
+
+
+def evict(cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+    """Delete the least recently used entries until the cache fits in max_bytes."""
+    entries = []
+    total = 0
+    for name in os.listdir(cache_dir):
+        if not name.endswith(".json"):
+            continue
+        try:
+            stat = os.stat(os.path.join(cache_dir, name))
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, name))
+        total += stat.st_size
+
+    for _, size, name in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(os.path.join(cache_dir, name))
+            total -= size
+        except OSError:
+            pass
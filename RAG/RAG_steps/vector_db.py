@@ -1,27 +1,89 @@
-import chromadb
+import os
+import threading
+from RAG.RAG_steps.vector_store import ChromaVectorStore, NumpyVectorStore
+
+#"chroma": HNSW index in ./chroma_persist, "numpy": exact search over a memory-mapped matrix
+VECTOR_BACKEND = os.getenv("RAG_VECTOR_BACKEND", "chroma")
+#numpy backend only: search compressed "float16" / "int8" / "binary" codes first, then rescore exactly
+VECTOR_QUANTIZATION = os.getenv("RAG_VECTOR_QUANTIZATION") or None
+
+#HNSW settings of a new Chroma collection (Chroma's defaults). Space and graph
+#settings are fixed once the collection exists; pick them with
+#RAG/Benchmarks/bench_hnsw.py. Distance space (numpy backend too): "l2" (squared), "cosine" or "ip"
+HNSW_SPACE = "l2"
+#links per node: more = better recall, more memory and slower build
+HNSW_M = 16
+#candidate list while building: more = better graph, slower build
+HNSW_EF_CONSTRUCTION = 100
+#candidate list while searching: more = better recall, slower queries
+HNSW_EF_SEARCH = 10
 
 _vector_db_client = None
 _my_db_collection = None
+_vector_store = None
+# The warm-up thread and a page may open the database at the same time
+_lock = threading.RLock()
 
 def get_vector_db_client(persist_directory = "./chroma_persist"):
     global _vector_db_client
 
     if _vector_db_client is None:
-        _vector_db_client = chromadb.PersistentClient(path=persist_directory)
+        with _lock:
+            if _vector_db_client is None:
+                import chromadb
+                _vector_db_client = chromadb.PersistentClient(path=persist_directory)
 
     return _vector_db_client
 
-def get_db_collection(my_db_collection_name = "my_demo_rag_collection"):
+def hnsw_metadata(space=HNSW_SPACE, m=HNSW_M, ef_construction=HNSW_EF_CONSTRUCTION, ef_search=HNSW_EF_SEARCH):
+    """Chroma collection metadata configuring its HNSW index."""
+    if space not in ("l2", "cosine", "ip"):
+        raise ValueError(f"Unsupported space: {space}")
+    return {
+        "hnsw:space": space,
+        "hnsw:M": m,
+        "hnsw:construction_ef": ef_construction,
+        "hnsw:search_ef": ef_search
+    }
+
+def get_db_collection(my_db_collection_name = "my_demo_rag_collection", space=HNSW_SPACE, m=HNSW_M,
+                      ef_construction=HNSW_EF_CONSTRUCTION, ef_search=HNSW_EF_SEARCH):
     global _my_db_collection
     
     if _my_db_collection is None:
-        client = get_vector_db_client()
-        existing_collections = [c.name for c in client.list_collections()]
+        with _lock:
+            if _my_db_collection is None:
+                client = get_vector_db_client()
+                existing_collections = [c.name for c in client.list_collections()]
+                metadata = hnsw_metadata(space, m, ef_construction, ef_search)
 
-        # Check if it exists
-        if my_db_collection_name in existing_collections:
-            _my_db_collection = client.get_collection(name=my_db_collection_name)
-        else:
-            _my_db_collection = client.create_collection(name=my_db_collection_name)
+                # Check if it exists
+                if my_db_collection_name in existing_collections:
+                    _my_db_collection = client.get_collection(name=my_db_collection_name)
+                    current = {key: value for key, value in (_my_db_collection.metadata or {}).items()
+                               if key.startswith("hnsw:")}
+                    if current.get("hnsw:space", "l2") != space or any(
+                            key in current and current[key] != value for key, value in metadata.items()):
+                        print(f"Collection {my_db_collection_name} keeps the HNSW settings it was created with "
+                              f"({current or 'Chroma defaults'}); delete it to apply {metadata}")
+                else:
+                    _my_db_collection = client.create_collection(name=my_db_collection_name, metadata=metadata)
 
     return _my_db_collection
+
+
+def get_vector_store():
+    """The vector store selected by RAG_VECTOR_BACKEND, shared by all pages."""
+    global _vector_store
+
+    if _vector_store is None:
+        with _lock:
+            if _vector_store is None:
+                if VECTOR_BACKEND == "numpy":
+                    _vector_store = NumpyVectorStore(space=HNSW_SPACE, quantization=VECTOR_QUANTIZATION)
+                elif VECTOR_BACKEND == "chroma":
+                    _vector_store = ChromaVectorStore(get_db_collection(), get_vector_db_client())
+                else:
+                    raise ValueError(f"Unknown vector backend: {VECTOR_BACKEND}")
+
+    return _vector_store
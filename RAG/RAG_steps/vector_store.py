@@ -0,0 +1,502 @@
+import json
+import os
+import threading
+import numpy as np
+
+NUMPY_STORE_DIR = "./vector_store"
+
+QUANTIZATIONS = ("float16", "int8", "binary")
+# The exact rescoring stage ranks n_results * factor shortlisted rows;
+# coarser codes need a longer shortlist for the same recall
+RESCORE_FACTORS = {"float16": 4, "int8": 10, "binary": 40}
+# Codes are converted to float32 this many rows at a time while scanning
+SCAN_BLOCK = 8192
+# The records log is folded into records.json once it holds more records
+# than the store (and at least this many)
+MIN_LOG_RECORDS_BEFORE_COMPACTION = 10000
+
+
+def matches(metadata, where):
+    """
+    True when `metadata` satisfies a Chroma-style equality filter:
+    {"patient": "Sara"}, {"patient": {"$eq": "Sara"}} or
+    {"patient": {"$in": ["Sara", "Ali"]}}; several keys must all match.
+    """
+    for key, condition in where.items():
+        value = metadata.get(key)
+        if isinstance(condition, dict):
+            if "$eq" in condition and value != condition["$eq"]:
+                return False
+            if "$in" in condition and value not in condition["$in"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+def int8_scale(vectors):
+    """Per-dimension scale mapping the largest absolute value to 127."""
+    return np.maximum(np.abs(vectors).max(axis=0), 1e-12) / 127
+
+
+def encode_codes(vectors, quantization, scale=None):
+    """Compressed codes of float32 vectors: float16, int8 (with `scale`) or packed sign bits."""
+    if quantization == "float16":
+        return vectors.astype(np.float16)
+    if quantization == "int8":
+        return np.clip(np.rint(vectors / scale), -127, 127).astype(np.int8)
+    return np.packbits(vectors > 0, axis=1)
+
+
+if hasattr(np, "bitwise_count"):
+    def _popcount(bytes_):
+        return np.bitwise_count(bytes_)
+else:
+    _POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _popcount(bytes_):
+        return _POPCOUNT[bytes_]
+
+
+def hamming_distances(query_code, codes):
+    """Number of differing sign bits between one packed query code and each row of codes."""
+    return _popcount(np.bitwise_xor(codes, query_code)).sum(axis=1, dtype=np.int32)
+
+
+class VectorStore:
+    """
+    Storage of chunk embeddings, texts and metadata.
+    Method names, arguments and returned dictionaries follow the Chroma
+    collection API, so callers work the same with every backend.
+    """
+    name = "VectorStore"
+    # Most ids accepted by one call (None: no limit)
+    max_batch_size = None
+    # Bumped by every upsert, update and delete made through this object
+    version = 0
+    # Distance returned by query(): "l2" (squared), "cosine" or "ip"
+    space = "l2"
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        raise NotImplementedError
+
+    def update(self, ids, metadatas):
+        raise NotImplementedError
+
+    def query(self, query_embeddings, n_results=10, where=None):
+        """
+        Returns {'ids', 'documents', 'metadatas', 'distances'}, one list per query.
+        `where` restricts the search to chunks whose metadata matches it.
+        """
+        raise NotImplementedError
+
+    def get(self, ids=None):
+        """Returns {'ids', 'documents', 'metadatas'} of the ids that exist (all when ids is None)."""
+        raise NotImplementedError
+
+    def delete(self, ids):
+        raise NotImplementedError
+
+    def count(self):
+        raise NotImplementedError
+
+
+class ChromaVectorStore(VectorStore):
+    """Chroma collection (HNSW index, SQLite metadata)."""
+    name = "ChromaDB"
+
+    def __init__(self, collection, client=None):
+        self.collection = collection
+        self.client = client
+        self.space = (collection.metadata or {}).get("hnsw:space", "l2")
+
+    @property
+    def max_batch_size(self):
+        if self.client is None:
+            return None
+        # Exposed as a method since chromadb 0.5, as an attribute before
+        if hasattr(self.client, "get_max_batch_size"):
+            return self.client.get_max_batch_size()
+        return getattr(self.client, "max_batch_size", None)
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        self.collection.upsert(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+        self.version += 1
+
+    def update(self, ids, metadatas):
+        self.collection.update(ids=ids, metadatas=metadatas)
+        self.version += 1
+
+    def query(self, query_embeddings, n_results=10, where=None):
+        # Chroma wants several conditions spelled out with $and
+        if where and len(where) > 1:
+            where = {"$and": [{key: condition} for key, condition in where.items()]}
+        return self.collection.query(query_embeddings=query_embeddings, n_results=n_results, where=where or None)
+
+    def get(self, ids=None):
+        return self.collection.get(ids=ids)
+
+    def delete(self, ids):
+        self.collection.delete(ids=ids)
+        self.version += 1
+
+    def count(self):
+        return self.collection.count()
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    Exact search over one contiguous float32 matrix.
+    The matrix lives in `vectors.f32`, memory-mapped so opening the store
+    does not read it and the OS page cache keeps it warm; ids, texts and
+    metadata live in `records.json`, in the same row order. A query is a
+    single matrix multiply, faster than HNSW for a few thousand chunks.
+    Deleted rows are filled with the last row, so live rows stay contiguous.
+    Distances match Chroma's for the same space ("l2" is squared L2).
+
+    Writes append one line to a records log instead of rewriting
+    records.json, so storing N chunks in small batches costs O(N), not
+    O(N^2). Opening the store replays the log; once it holds more records
+    than the store, it is compacted into a new records.json.
+
+    With `quantization` ("float16", "int8" or "binary" sign bits) a
+    compressed copy of the matrix is kept in memory and searched first; only
+    a shortlist of n_results * RESCORE_FACTORS rows is then read from the
+    float32 file and rescored exactly. The codes are rebuilt from the file
+    when the store is opened (int8 scales are calibrated then as well).
+    NumPy has no float16 or int8 matrix multiply: those codes are converted
+    to float32 block by block on every query, so both modes only save
+    memory and scan slower than exact float32 search. Only binary codes
+    (Hamming distances over packed bits) are also faster to scan.
+    """
+    name = "NumPy"
+
+    def __init__(self, directory=NUMPY_STORE_DIR, space="l2", quantization=None):
+        if space not in ("l2", "cosine", "ip"):
+            raise ValueError(f"Unsupported space: {space}")
+        if quantization is not None and quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unsupported quantization: {quantization}")
+        self.directory = directory
+        self.space = space
+        self.quantization = quantization
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.records_path = os.path.join(directory, "records.json")
+        self._lock = threading.RLock()
+        # records.json names the generation of the log to replay on top of it
+        self._generation = 0
+        self._logged_records = 0
+
+        self.dim = None
+        self.ids = []
+        self.documents = []
+        self.metadatas = []
+        self._index = {}
+        self._masks = {}
+        self._norms = np.zeros(0, dtype=np.float32)
+        self._vectors = None
+        self._capacity = 0
+        self._codes = None
+        self._scale = None
+        self._load()
+
+    def _log_path(self, generation):
+        return os.path.join(self.directory, f"records.{generation}.log")
+
+    def _load(self):
+        if os.path.exists(self.records_path):
+            with open(self.records_path, "r", encoding="utf-8") as f:
+                records = json.load(f)
+            self.dim = records['dim']
+            self.ids = records['ids']
+            self.documents = records['documents']
+            self.metadatas = records['metadatas']
+            self._generation = records.get('generation', 0)
+        self._index = {chunk_id: row for row, chunk_id in enumerate(self.ids)}
+        self._replay_log()
+        if self.dim:
+            self._capacity = os.path.getsize(self.vectors_path) // (self.dim * 4)
+            self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+",
+                                      shape=(self._capacity, self.dim))
+        self._norms = self._row_norms(0, len(self.ids))
+
+        if self.quantization and self.dim:
+            count = len(self.ids)
+            self._codes = self._empty_codes(self._capacity)
+            if self.quantization == "int8" and count:
+                self._scale = int8_scale(self._vectors[:count])
+            for start in range(0, count, SCAN_BLOCK):
+                end = min(start + SCAN_BLOCK, count)
+                self._codes[start:end] = encode_codes(self._vectors[start:end], self.quantization, self._scale)
+
+    def _replay_log(self):
+        """Apply the writes logged since records.json was written."""
+        log_path = self._log_path(self._generation)
+        if not os.path.exists(log_path):
+            return
+        with open(log_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Last line cut short by a crash: its write was never acknowledged
+                    break
+                if entry['op'] == "upsert":
+                    self.dim = entry['dim']
+                    self._upsert_records(entry['ids'], entry['documents'], entry['metadatas'])
+                elif entry['op'] == "update":
+                    self._update_records(entry['ids'], entry['metadatas'])
+                else:
+                    self._delete_records(entry['ids'])
+                self._logged_records += len(entry['ids'])
+
+    def _empty_codes(self, capacity):
+        if self.quantization == "binary":
+            return np.zeros((capacity, (self.dim + 7) // 8), dtype=np.uint8)
+        return np.zeros((capacity, self.dim), dtype=np.float16 if self.quantization == "float16" else np.int8)
+
+    def _row_norms(self, start, end):
+        if self._vectors is None:
+            return np.zeros(0, dtype=np.float32)
+        return np.linalg.norm(self._vectors[start:end], axis=1)
+
+    def _reserve(self, rows):
+        """Grow the memory-mapped file (doubling) to hold at least `rows` rows."""
+        if rows <= self._capacity:
+            return
+        capacity = max(rows, self._capacity * 2, 1024)
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.vectors_path, "ab") as f:
+            f.truncate(capacity * self.dim * 4)
+        self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+",
+                                  shape=(capacity, self.dim))
+        if self.quantization:
+            codes = self._empty_codes(capacity)
+            if self._codes is not None:
+                codes[:len(self._codes)] = self._codes
+            self._codes = codes
+        self._capacity = capacity
+
+    def _save(self, entry):
+        """Flush the vectors, then append the write to the records log."""
+        # Every write goes through here: cached filter masks are stale
+        self._masks = {}
+        self.version += 1
+        if self._vectors is not None:
+            self._vectors.flush()
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._log_path(self._generation), "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._logged_records += len(entry['ids'])
+        if self._logged_records > max(len(self.ids), MIN_LOG_RECORDS_BEFORE_COMPACTION):
+            self.compact()
+
+    def compact(self):
+        """Write every record to a new records.json and start an empty log."""
+        with self._lock:
+            old_log = self._log_path(self._generation)
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = self.records_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                # dumps() uses the C encoder, dump() to a file does not
+                f.write(json.dumps({
+                    'dim': self.dim,
+                    'generation': self._generation + 1,
+                    'ids': self.ids,
+                    'documents': self.documents,
+                    'metadatas': self.metadatas
+                }, ensure_ascii=False))
+            # From here on the old log is ignored, even if removing it fails
+            os.replace(tmp_path, self.records_path)
+            self._generation += 1
+            self._logged_records = 0
+            if os.path.exists(old_log):
+                os.remove(old_log)
+
+    def _upsert_records(self, ids, documents, metadatas):
+        """Store the records of an upsert. Returns: The row of each id"""
+        rows = []
+        for chunk_id, document, metadata in zip(ids, documents, metadatas):
+            row = self._index.get(chunk_id)
+            if row is None:
+                row = len(self.ids)
+                self._index[chunk_id] = row
+                self.ids.append(chunk_id)
+                self.documents.append(document)
+                self.metadatas.append(metadata)
+            else:
+                self.documents[row] = document
+                self.metadatas[row] = metadata
+            rows.append(row)
+        return rows
+
+    def _update_records(self, ids, metadatas):
+        for chunk_id, metadata in zip(ids, metadatas):
+            row = self._index.get(chunk_id)
+            if row is not None:
+                self.metadatas[row] = metadata
+
+    def _delete_records(self, ids):
+        """
+        Remove the records of ids, filling each hole with the last row.
+        Returns: List of (row, last row moved into it), in order
+        """
+        moves = []
+        for chunk_id in ids:
+            row = self._index.pop(chunk_id, None)
+            if row is None:
+                continue
+            last = len(self.ids) - 1
+            if row != last:
+                self.ids[row] = self.ids[last]
+                self.documents[row] = self.documents[last]
+                self.metadatas[row] = self.metadatas[last]
+                self._index[self.ids[row]] = row
+                moves.append((row, last))
+            self.ids.pop()
+            self.documents.pop()
+            self.metadatas.pop()
+        return moves
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match the store ({self.dim})")
+
+            rows = self._upsert_records(ids, documents, metadatas)
+            self._reserve(len(self.ids))
+            self._vectors[rows] = vectors
+            if self.quantization:
+                # Calibrated on the first batch; later values beyond it are clipped
+                if self.quantization == "int8" and self._scale is None:
+                    self._scale = int8_scale(vectors)
+                self._codes[rows] = encode_codes(vectors, self.quantization, self._scale)
+            norms = np.zeros(len(self.ids), dtype=np.float32)
+            norms[:len(self._norms)] = self._norms
+            norms[rows] = np.linalg.norm(vectors, axis=1)
+            self._norms = norms
+            self._save({'op': "upsert", 'dim': self.dim, 'ids': list(ids),
+                        'documents': list(documents), 'metadatas': list(metadatas)})
+
+    def update(self, ids, metadatas):
+        with self._lock:
+            self._update_records(ids, metadatas)
+            self._save({'op': "update", 'ids': list(ids), 'metadatas': list(metadatas)})
+
+    def delete(self, ids):
+        with self._lock:
+            for row, last in self._delete_records(ids):
+                self._vectors[row] = self._vectors[last]
+                if self.quantization:
+                    self._codes[row] = self._codes[last]
+                self._norms[row] = self._norms[last]
+            self._norms = self._norms[:len(self.ids)]
+            self._save({'op': "delete", 'ids': list(ids)})
+
+    def get(self, ids=None):
+        with self._lock:
+            rows = range(len(self.ids)) if ids is None else [self._index[i] for i in ids if i in self._index]
+            return {
+                'ids': [self.ids[row] for row in rows],
+                'documents': [self.documents[row] for row in rows],
+                'metadatas': [self.metadatas[row] for row in rows]
+            }
+
+    def count(self):
+        return len(self.ids)
+
+    def _distances(self, queries, scores, norms):
+        """Distances in the store's space from dot products `scores` of queries with rows."""
+        if self.space == "ip":
+            return 1 - scores
+        if self.space == "cosine":
+            query_norms = np.linalg.norm(queries, axis=1, keepdims=True)
+            return 1 - scores / np.maximum(query_norms * norms[None, :], 1e-12)
+        squared = np.sum(queries * queries, axis=1, keepdims=True) + (norms * norms)[None, :] - 2 * scores
+        return np.maximum(squared, 0)
+
+    def query(self, query_embeddings, n_results=10, where=None):
+        queries = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+        results = {'ids': [], 'documents': [], 'metadatas': [], 'distances': []}
+
+        with self._lock:
+            count = len(self.ids)
+            candidates = None
+            if where:
+                # Pre-filter: only the matching rows are scored
+                key = json.dumps(where, sort_keys=True)
+                if key not in self._masks:
+                    self._masks[key] = np.flatnonzero([matches(metadata, where) for metadata in self.metadatas])
+                candidates = self._masks[key]
+
+            k = min(n_results, count if candidates is None else len(candidates))
+            if k == 0:
+                for key in results:
+                    results[key] = [[] for _ in queries]
+                return results
+
+            if self.quantization:
+                ranked = self._two_stage_search(queries, candidates, count, k)
+            else:
+                ranked = self._exact_search(queries, candidates, count, k)
+            for rows, query_distances in ranked:
+                results['ids'].append([self.ids[row] for row in rows])
+                results['documents'].append([self.documents[row] for row in rows])
+                results['metadatas'].append([self.metadatas[row] for row in rows])
+                results['distances'].append(query_distances.tolist())
+        return results
+
+    def _exact_search(self, queries, candidates, count, k):
+        """Yield (rows, distances) of the k nearest rows of each query."""
+        if candidates is None:
+            matrix, norms = self._vectors[:count], self._norms
+        else:
+            matrix, norms = self._vectors[candidates], self._norms[candidates]
+        distances = self._distances(queries, queries @ matrix.T, norms)
+        # Partial sort: only the k best rows of each query are ordered
+        top = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        for query_distances, positions in zip(distances, top):
+            positions = positions[np.argsort(query_distances[positions])]
+            rows = positions if candidates is None else candidates[positions]
+            yield rows, query_distances[positions]
+
+    def _approximate_distances(self, queries, candidates, count):
+        """
+        First stage: distances over the compressed codes (Hamming distances
+        for binary codes). float16 and int8 blocks are converted to float32
+        for the matmul, which costs more than the scan it replaces.
+        """
+        codes = self._codes[:count] if candidates is None else self._codes[candidates]
+        if self.quantization == "binary":
+            query_codes = np.packbits(queries > 0, axis=1)
+            return np.stack([hamming_distances(query_code, codes) for query_code in query_codes])
+
+        norms = self._norms[:count] if candidates is None else self._norms[candidates]
+        # int8 rows are codes * scale, so q . row = (q * scale) . codes
+        scaled = queries * self._scale if self.quantization == "int8" else queries
+        distances = np.empty((len(queries), len(codes)), dtype=np.float32)
+        for start in range(0, len(codes), SCAN_BLOCK):
+            block = slice(start, start + SCAN_BLOCK)
+            scores = scaled @ codes[block].astype(np.float32).T
+            distances[:, block] = self._distances(queries, scores, norms[block])
+        return distances
+
+    def _two_stage_search(self, queries, candidates, count, k):
+        """Shortlist with the compressed codes, then rescore the shortlist exactly."""
+        approximate = self._approximate_distances(queries, candidates, count)
+        shortlist_size = min(k * RESCORE_FACTORS[self.quantization], approximate.shape[1])
+        shortlists = np.argpartition(approximate, shortlist_size - 1, axis=1)[:, :shortlist_size]
+        for query, positions in zip(queries, shortlists):
+            rows = positions if candidates is None else candidates[positions]
+            # Sorted rows read the memory-mapped file front to back
+            rows = np.sort(rows)
+            query = query[None, :]
+            distances = self._distances(query, query @ self._vectors[rows].T, self._norms[rows])[0]
+            best = np.argsort(distances)[:k]
+            yield rows[best], distances[best]
+
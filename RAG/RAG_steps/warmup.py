@@ -0,0 +1,64 @@
+import os
+import sys
+import threading
+import time
+from RAG.RAG_steps.embeddings import get_embedder, bundle_model, MODEL_DIR
+from RAG.RAG_steps.vector_db import get_vector_store
+
+_started = False
+_lock = threading.Lock()
+_done = threading.Event()
+timings = {}
+
+
+def _warm_up():
+    try:
+        start = time.perf_counter()
+        model = get_embedder()
+        timings['load_model'] = time.perf_counter() - start
+
+        # The first encode initializes lazy kernels and thread pools
+        start = time.perf_counter()
+        model.encode(["warm up"], show_progress_bar=False)
+        timings['first_encode'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        get_vector_store()
+        timings['open_vector_db'] = time.perf_counter() - start
+
+        print("RAG warm-up done: " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items()))
+    except Exception as e:
+        print(f"RAG warm-up failed: {e}")
+    finally:
+        _done.set()
+
+
+def start_warmup():
+    """
+    Load the embedding model and open the vector database in a background
+    thread, so the first chat question does not pay for it.
+    Safe to call on every Streamlit rerun: only the first call starts a thread.
+    Set RAG_WARMUP=0 to disable it (e.g. while developing other pages).
+    """
+    global _started
+    if os.getenv("RAG_WARMUP", "1") == "0":
+        return
+    with _lock:
+        if _started:
+            return
+        _started = True
+
+    threading.Thread(target=_warm_up, name="rag-warmup", daemon=True).start()
+
+
+def wait_for_warmup(timeout=None):
+    """Block until the warm-up finished. Returns False on timeout."""
+    return _done.wait(timeout)
+
+
+if __name__ == "__main__":
+    # python -m RAG.RAG_steps.warmup --bundle : store the model files locally
+    if "--bundle" in sys.argv:
+        print(f"Model bundled in {bundle_model()}")
+    else:
+        print(f"Usage: python -m RAG.RAG_steps.warmup --bundle  (downloads the model to {MODEL_DIR})")
@@ -1,4 +1,9 @@
 import streamlit as st
+from RAG.RAG_steps.warmup import start_warmup
+
+# Load the embedding model and the vector database in the background while
+# the first page renders (no-op on reruns)
+start_warmup()
 
 page = st.navigation(
     [
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Test deduplication together with patient-scoped retrieval"""
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from RAG.RAG_steps import ingestion
+from RAG.RAG_steps.bm25 import BM25Index
+from RAG.RAG_steps.patients import SHARED_PATIENT, patient_filter
+from RAG.RAG_steps.similarity import retrieve_batch
+from RAG.RAG_steps.vector_store import NumpyVectorStore
+
+LAB_PANEL = ("Complete blood count: Hemoglobin {} g/dL, white blood cells 6.1 x10^9/L, "
+             "platelets 250 x10^9/L, hematocrit 42 percent. Reviewed by the laboratory.")
+LETTERHEAD = "City Medical Center, 12 Main Street. Confidential patient record, do not distribute."
+# A multi-patient spreadsheet: its chunks have no single patient
+SHARED_ROWS = '{"patient":"Sara","test":"Ferritin","value":"8 ng/mL"}\n{"patient":"Ali","test":"Ferritin","value":"95 ng/mL"}'
+
+
+def fake_embed_texts(texts, workers=1):
+    """Deterministic vectors, so the test does not need the embedding model."""
+    return [np.random.default_rng(list(text.encode("utf-8"))).normal(size=16).tolist() for text in texts]
+
+
+def report_chunks():
+    chunks = []
+    for doc_id, (source, hemoglobin) in enumerate([("Ali_report.pdf", "14.2"), ("Sara_report.pdf", "9.1")]):
+        for chunk_id, text in enumerate([LETTERHEAD, LAB_PANEL.format(hemoglobin)]):
+            chunks.append({'source': source, 'doc_id': doc_id, 'chunk_id': chunk_id, 'page': 1, 'text': text})
+    chunks.append({'source': "lab_results.xlsx", 'doc_id': 2, 'chunk_id': 0, 'row_start': 1, 'row_end': 2,
+                   'text': SHARED_ROWS})
+    return chunks
+
+
+def ingest(directory):
+    store = NumpyVectorStore(directory)
+    keyword_index = BM25Index(os.path.join(directory, "bm25_index.json"))
+    original = ingestion.embed_texts
+    ingestion.embed_texts = fake_embed_texts
+    try:
+        ingestion.ingest_chunks(report_chunks(), store, deduplicate=True, keyword_index=keyword_index)
+    finally:
+        ingestion.embed_texts = original
+    return store, keyword_index
+
+
+def test_reports_differing_by_one_value_are_both_stored():
+    with tempfile.TemporaryDirectory() as directory:
+        store, _ = ingest(directory)
+        documents = store.get()['documents']
+        assert LAB_PANEL.format("14.2") in documents
+        assert LAB_PANEL.format("9.1") in documents
+
+
+def test_patient_scoped_search_sees_only_that_patients_chunks():
+    with tempfile.TemporaryDirectory() as directory:
+        store, keyword_index = ingest(directory)
+        question = "What is the hemoglobin in the blood count?"
+        query = fake_embed_texts([LAB_PANEL.format("9.1")])
+
+        for patient, hemoglobin in [("Sara", "9.1"), ("Ali", "14.2")]:
+            for index in (None, keyword_index):
+                results = retrieve_batch(query, store, top_k=4, where=patient_filter(patient),
+                                         query_texts=[question], keyword_index=index)[0]
+                assert {metadata['patient'] for metadata in results['metadatas']} == {patient, SHARED_PATIENT}
+                assert LAB_PANEL.format(hemoglobin) in results['documents']
+                # The letterhead shared by both reports is found for each patient
+                assert LETTERHEAD in results['documents']
+                # So are the rows of the multi-patient spreadsheet
+                assert SHARED_ROWS in results['documents']
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("TEST 1: Reports differing by one value are both stored")
+    print("=" * 60)
+    test_reports_differing_by_one_value_are_both_stored()
+    print("OK\n")
+
+    print("=" * 60)
+    print("TEST 2: Patient-scoped search after deduplication")
+    print("=" * 60)
+    test_patient_scoped_search_sees_only_that_patients_chunks()
+    print("OK")
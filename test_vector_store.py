@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""Test the NumPy vector store, the BM25 index and the ingestion manifest"""
+import sys
+import os
+import random
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from RAG.RAG_steps import vector_store
+from RAG.RAG_steps.bm25 import BM25Index
+from RAG.RAG_steps.manifest import forget_file, record_file
+from RAG.RAG_steps.vector_store import NumpyVectorStore
+
+
+def check_store(store, reference):
+    """The store holds exactly the records of `reference` (id -> (document, metadata, vector))."""
+    stored = store.get()
+    assert sorted(stored['ids']) == sorted(reference)
+    for chunk_id, document, metadata in zip(stored['ids'], stored['documents'], stored['metadatas']):
+        assert (document, metadata) == reference[chunk_id][:2], chunk_id
+
+    # Each stored vector is its own nearest neighbour
+    sample = list(reference)[:5]
+    if sample:
+        results = store.query(np.stack([reference[chunk_id][2] for chunk_id in sample]), n_results=1)
+        assert [ids[0] for ids in results['ids']] == sample
+
+
+def run_random_writes(quantization, compaction_threshold, steps=200, seed=0):
+    """Random upserts, updates and deletes, checked against a dict after every reopen."""
+    rng = np.random.default_rng(seed)
+    choose = random.Random(seed)
+    original_threshold = vector_store.MIN_LOG_RECORDS_BEFORE_COMPACTION
+    vector_store.MIN_LOG_RECORDS_BEFORE_COMPACTION = compaction_threshold
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            store = NumpyVectorStore(directory, quantization=quantization)
+            reference = {}
+            for step in range(steps):
+                operation = choose.random()
+                if operation < 0.6 or not reference:
+                    ids = list(dict.fromkeys(f"chunk_{choose.randrange(3000)}" for _ in range(choose.randint(1, 20))))
+                    vectors = rng.normal(size=(len(ids), 16)).astype(np.float32)
+                    documents = [f"{chunk_id} written at step {step}" for chunk_id in ids]
+                    metadatas = [{'step': step} for _ in ids]
+                    store.upsert(ids, vectors, documents, metadatas)
+                    for chunk_id, vector, document, metadata in zip(ids, vectors, documents, metadatas):
+                        reference[chunk_id] = (document, metadata, vector)
+                elif operation < 0.8:
+                    ids = choose.sample(sorted(reference), min(5, len(reference)))
+                    metadatas = [{'updated': step} for _ in ids]
+                    store.update(ids, metadatas)
+                    for chunk_id, metadata in zip(ids, metadatas):
+                        document, _, vector = reference[chunk_id]
+                        reference[chunk_id] = (document, metadata, vector)
+                else:
+                    ids = choose.sample(sorted(reference), min(7, len(reference))) + ["never_stored"]
+                    store.delete(ids)
+                    for chunk_id in ids:
+                        reference.pop(chunk_id, None)
+
+                if step % 40 == 0:
+                    check_store(store, reference)
+                    check_store(NumpyVectorStore(directory, quantization=quantization), reference)
+
+            check_store(NumpyVectorStore(directory, quantization=quantization), reference)
+
+            # A log line cut short by a crash is ignored
+            with open(store._log_path(store._generation), "a", encoding="utf-8") as f:
+                f.write('{"op": "upsert", "ids": ["torn"')
+            check_store(NumpyVectorStore(directory, quantization=quantization), reference)
+            return store._generation
+    finally:
+        vector_store.MIN_LOG_RECORDS_BEFORE_COMPACTION = original_threshold
+
+
+def test_numpy_store_survives_reopen():
+    assert run_random_writes(None, compaction_threshold=10000) == 0
+
+
+def test_numpy_store_survives_compaction():
+    assert run_random_writes(None, compaction_threshold=50) > 0
+
+
+def test_quantized_numpy_store_survives_reopen_and_compaction():
+    run_random_writes("int8", compaction_threshold=10000)
+    run_random_writes("binary", compaction_threshold=50)
+
+
+def test_bm25_add_remove_save_load():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bm25_index.json")
+        index = BM25Index(path)
+        index.add(["a", "b", "c"],
+                  ["hba1c 5.2 percent", "blood pressure 120/80", "hba1c 7.9 percent, diabetic"],
+                  [{'patient': "Ali"}, {'patient': "Sara"}, {'patient': "Sara"}])
+        assert [chunk_id for chunk_id, _ in index.search("hba1c")] in (["a", "c"], ["c", "a"])
+        assert [chunk_id for chunk_id, _ in index.search("120/80")] == ["b"]
+        assert [chunk_id for chunk_id, _ in index.search("hba1c", where={'patient': "Sara"})] == ["c"]
+
+        index.remove(["c"])
+        index.add(["d"], ["metformin 500 mg"], [{'patient': "Ali"}])
+        assert index.count() == 3
+        index.save()
+
+        loaded = BM25Index(path)
+        assert loaded.count() == 3
+        for query in ("hba1c", "120/80", "metformin", "diabetic"):
+            assert loaded.search(query) == index.search(query), query
+        assert loaded.search("diabetic") == []
+
+
+def test_forget_file_keeps_chunks_referenced_by_other_files():
+    removed = []
+
+    class Collection:
+        def delete(self, ids):
+            removed.extend(ids)
+
+    manifest = {}
+    settings = {'chunk_size': 500}
+    # "letterhead" was deduplicated: both reports reference it
+    record_file(manifest, "Ali_report.pdf", "hash1", settings, ["ali_1", "ali_2", "letterhead"])
+    record_file(manifest, "Ali_labs.pdf", "hash2", settings, ["labs_1", "letterhead"])
+
+    index = BM25Index(os.path.join(tempfile.mkdtemp(), "bm25_index.json"))
+    index.add(["ali_1", "ali_2", "letterhead"], ["one", "two", "header"], [{}, {}, {}])
+
+    # The new version of the report still produces ali_2
+    assert forget_file(manifest, "Ali_report.pdf", Collection(), keep=["ali_2"], keyword_index=index) == ["ali_1"]
+    assert removed == ["ali_1"]
+    assert "Ali_report.pdf" not in manifest
+    assert index.search("one") == [] and index.search("header")
+
+    assert forget_file(manifest, "Ali_labs.pdf", Collection()) == ["labs_1", "letterhead"]
+    assert forget_file(manifest, "unknown.pdf", Collection()) == []
+
+
+if __name__ == "__main__":
+    tests = [
+        test_numpy_store_survives_reopen,
+        test_numpy_store_survives_compaction,
+        test_quantized_numpy_store_survives_reopen_and_compaction,
+        test_bm25_add_remove_save_load,
+        test_forget_file_keeps_chunks_referenced_by_other_files,
+    ]
+    for number, test in enumerate(tests, start=1):
+        print("=" * 60)
+        print(f"TEST {number}: {test.__name__}")
+        print("=" * 60)
+        test()
+        print("OK\n")